@@ -0,0 +1,36 @@
+"""add_imported_files
+
+Revision ID: 0a7d5c3e8b61
+Revises: f6c18a2b9e03
+Create Date: 2026-10-18 15:02:33.146920
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0a7d5c3e8b61'
+down_revision: Union[str, Sequence[str], None] = 'f6c18a2b9e03'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('imported_files',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('sha256', sa.String(length=64), nullable=False),
+    sa.Column('name', sa.String(), nullable=False),
+    sa.Column('rows', sa.Integer(), nullable=False),
+    sa.Column('imported_at', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('sha256')
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('imported_files')
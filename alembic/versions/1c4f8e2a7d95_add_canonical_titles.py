@@ -0,0 +1,32 @@
+"""add_canonical_titles
+
+Revision ID: 1c4f8e2a7d95
+Revises: 0a7d5c3e8b61
+Create Date: 2026-10-18 15:48:19.604417
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '1c4f8e2a7d95'
+down_revision: Union[str, Sequence[str], None] = '0a7d5c3e8b61'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('canonical_titles',
+    sa.Column('raw_title', sa.String(), nullable=False),
+    sa.Column('title', sa.String(), nullable=False),
+    sa.PrimaryKeyConstraint('raw_title')
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('canonical_titles')
@@ -0,0 +1,64 @@
+"""add_transaction_import_hash
+
+Revision ID: 2bce51533abb
+Revises: 223c66b13dd2
+Create Date: 2026-10-18 09:12:41.208113
+
+"""
+import hashlib
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '2bce51533abb'
+down_revision: Union[str, Sequence[str], None] = '223c66b13dd2'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# Hash das linhas antigas, no mesmo formato que src.models._legacy_hashes calcula na importação
+LEGACY_HASH_PREFIX = 'legacy:'
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('transactions', sa.Column('import_hash', sa.String(length=40), nullable=True))
+
+    # O título original do arquivo não foi guardado: o hash das linhas antigas sai do título como
+    # foi gravado (minúsculas, sem "- Parcela N/M"), data, valor e ocorrência no mesmo dia
+    transactions = sa.table(
+        'transactions',
+        sa.column('id', sa.Integer), sa.column('date', sa.Date), sa.column('title', sa.String),
+        sa.column('amount', sa.Float), sa.column('import_hash', sa.String),
+    )
+    conn = op.get_bind()
+    rows = conn.execute(
+        sa.select(transactions.c.id, transactions.c.date, transactions.c.title, transactions.c.amount)
+        .order_by(transactions.c.id)
+    ).all()
+    seen = {}
+    hashes = []
+    for row_id, day, title, amount in rows:
+        key = (day.strftime('%Y-%m-%d'), str(title), f'{amount:.2f}')
+        occurrence = seen.get(key, 0)
+        seen[key] = occurrence + 1
+        digest = hashlib.sha1('|'.join([*key, str(occurrence)]).encode('utf-8')).hexdigest()
+        hashes.append({'row_id': row_id, 'hash': LEGACY_HASH_PREFIX + digest[:40 - len(LEGACY_HASH_PREFIX)]})
+    if hashes:
+        conn.execute(
+            transactions.update()
+            .where(transactions.c.id == sa.bindparam('row_id'))
+            .values(import_hash=sa.bindparam('hash')),
+            hashes,
+        )
+    op.create_index(op.f('ix_transactions_import_hash'), 'transactions', ['import_hash'], unique=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_transactions_import_hash'), table_name='transactions')
+    with op.batch_alter_table('transactions') as batch_op:
+        batch_op.drop_column('import_hash')
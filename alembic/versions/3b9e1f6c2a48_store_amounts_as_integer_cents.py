@@ -0,0 +1,60 @@
+"""store_amounts_as_integer_cents
+
+Revision ID: 3b9e1f6c2a48
+Revises: 8e2d6b4f1a73
+Create Date: 2026-10-18 17:12:04.516239
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3b9e1f6c2a48'
+down_revision: Union[str, Sequence[str], None] = '8e2d6b4f1a73'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Valores em reais (float) viram centavos inteiros, arredondados uma única vez
+    op.add_column('transactions', sa.Column('amount_cents', sa.BigInteger(), nullable=True))
+    op.execute("UPDATE transactions SET amount_cents = CAST(ROUND(amount * 100) AS BIGINT)")
+    with op.batch_alter_table('transactions') as batch_op:
+        batch_op.alter_column('amount_cents', existing_type=sa.BigInteger(), nullable=False)
+        batch_op.drop_column('amount')
+
+    # O resumo é recalculado a partir das transações já convertidas, sem carregar o erro do float
+    op.add_column('monthly_category_totals', sa.Column('total_cents', sa.BigInteger(), nullable=True))
+    if op.get_bind().dialect.name == 'postgresql':
+        next_month = "monthly_category_totals.month + INTERVAL '1 month'"
+    else:
+        next_month = "date(monthly_category_totals.month, '+1 month')"
+    op.execute(
+        "UPDATE monthly_category_totals SET total_cents = ("
+        "SELECT COALESCE(SUM(transactions.amount_cents), 0) FROM transactions "
+        "WHERE transactions.category_id = monthly_category_totals.category_id "
+        "AND transactions.date >= monthly_category_totals.month "
+        f"AND transactions.date < {next_month})"
+    )
+    with op.batch_alter_table('monthly_category_totals') as batch_op:
+        batch_op.alter_column('total_cents', existing_type=sa.BigInteger(), nullable=False)
+        batch_op.drop_column('total')
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.add_column('monthly_category_totals', sa.Column('total', sa.Float(), nullable=True))
+    op.execute("UPDATE monthly_category_totals SET total = total_cents / 100.0")
+    with op.batch_alter_table('monthly_category_totals') as batch_op:
+        batch_op.alter_column('total', existing_type=sa.Float(), nullable=False)
+        batch_op.drop_column('total_cents')
+
+    op.add_column('transactions', sa.Column('amount', sa.Float(), nullable=True))
+    op.execute("UPDATE transactions SET amount = amount_cents / 100.0")
+    with op.batch_alter_table('transactions') as batch_op:
+        batch_op.alter_column('amount', existing_type=sa.Float(), nullable=False)
+        batch_op.drop_column('amount_cents')
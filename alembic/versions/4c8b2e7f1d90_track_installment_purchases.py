@@ -0,0 +1,57 @@
+"""track_installment_purchases
+
+Revision ID: 4c8b2e7f1d90
+Revises: 6a1f3d8e2c57
+Create Date: 2026-10-18 21:02:44.105927
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '4c8b2e7f1d90'
+down_revision: Union[str, Sequence[str], None] = '6a1f3d8e2c57'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('installment_purchases',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('merchant_id', sa.Integer(), nullable=False),
+    sa.Column('amount_cents', sa.BigInteger(), nullable=False),
+    sa.Column('installment_total', sa.Integer(), nullable=False),
+    sa.Column('purchase_month', sa.Date(), nullable=False),
+    sa.Column('final_month', sa.Date(), nullable=False),
+    sa.ForeignKeyConstraint(['merchant_id'], ['merchants.id'], ),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('merchant_id', 'amount_cents', 'installment_total', 'purchase_month', name='uq_installment_purchases_series')
+    )
+    op.create_index(op.f('ix_installment_purchases_final_month'), 'installment_purchases', ['final_month'], unique=False)
+
+    # Transações já importadas ficam sem parcela: o título original não era guardado
+    with op.batch_alter_table('transactions') as batch_op:
+        batch_op.add_column(sa.Column('installment_number', sa.Integer(), nullable=True))
+        batch_op.add_column(sa.Column('installment_total', sa.Integer(), nullable=True))
+        batch_op.add_column(sa.Column('purchase_id', sa.Integer(), nullable=True))
+        batch_op.create_foreign_key('fk_transactions_purchase_id_installment_purchases', 'installment_purchases', ['purchase_id'], ['id'])
+    # Índice parcial: só as parcelas entram, compras à vista ficam de fora
+    op.create_index('ix_transactions_purchase_installment', 'transactions', ['purchase_id', 'installment_number'], unique=False,
+                    sqlite_where=sa.text('purchase_id IS NOT NULL'),
+                    postgresql_where=sa.text('purchase_id IS NOT NULL'))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_transactions_purchase_installment', table_name='transactions')
+    with op.batch_alter_table('transactions') as batch_op:
+        batch_op.drop_constraint('fk_transactions_purchase_id_installment_purchases', type_='foreignkey')
+        batch_op.drop_column('purchase_id')
+        batch_op.drop_column('installment_total')
+        batch_op.drop_column('installment_number')
+    op.drop_index(op.f('ix_installment_purchases_final_month'), table_name='installment_purchases')
+    op.drop_table('installment_purchases')
@@ -0,0 +1,28 @@
+"""add_transaction_date_index
+
+Revision ID: 5d8e2f7a1b36
+Revises: b41e6d0c9a57
+Create Date: 2026-10-18 11:15:52.640118
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5d8e2f7a1b36'
+down_revision: Union[str, Sequence[str], None] = 'b41e6d0c9a57'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index(op.f('ix_transactions_date'), 'transactions', ['date'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_transactions_date'), table_name='transactions')
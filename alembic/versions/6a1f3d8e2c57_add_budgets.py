@@ -0,0 +1,34 @@
+"""add_budgets
+
+Revision ID: 6a1f3d8e2c57
+Revises: 9d4a7c2e6b15
+Create Date: 2026-10-18 20:14:09.318542
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '6a1f3d8e2c57'
+down_revision: Union[str, Sequence[str], None] = '9d4a7c2e6b15'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('budgets',
+    sa.Column('category_id', sa.Integer(), nullable=False),
+    sa.Column('limit_cents', sa.BigInteger(), nullable=False),
+    sa.Column('alert_ratio', sa.Float(), server_default='0.8', nullable=False),
+    sa.ForeignKeyConstraint(['category_id'], ['categories.id'], ),
+    sa.PrimaryKeyConstraint('category_id')
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('budgets')
@@ -0,0 +1,30 @@
+"""add_keyword_match_type
+
+Revision ID: 7f3a9c1d2e84
+Revises: 2bce51533abb
+Create Date: 2026-10-18 10:04:17.553920
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '7f3a9c1d2e84'
+down_revision: Union[str, Sequence[str], None] = '2bce51533abb'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Palavras-chave já existentes continuam casando pelo título exato
+    op.add_column('keywords', sa.Column('match_type', sa.String(), server_default='exact', nullable=False))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.batch_alter_table('keywords') as batch_op:
+        batch_op.drop_column('match_type')
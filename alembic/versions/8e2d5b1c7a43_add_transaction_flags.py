@@ -0,0 +1,37 @@
+"""add_transaction_flags
+
+Revision ID: 8e2d5b1c7a43
+Revises: 4c8b2e7f1d90
+Create Date: 2026-10-18 22:37:10.481265
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8e2d5b1c7a43'
+down_revision: Union[str, Sequence[str], None] = '4c8b2e7f1d90'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Sem marcador em sync_state, a primeira avaliação cobre todas as transações já importadas
+    op.create_table('transaction_flags',
+    sa.Column('transaction_id', sa.Integer(), nullable=False),
+    sa.Column('kind', sa.String(), nullable=False),
+    sa.Column('score', sa.Float(), nullable=False),
+    sa.Column('expected_cents', sa.BigInteger(), nullable=True),
+    sa.Column('flagged_at', sa.DateTime(), nullable=False),
+    sa.ForeignKeyConstraint(['transaction_id'], ['transactions.id'], ),
+    sa.PrimaryKeyConstraint('transaction_id', 'kind')
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('transaction_flags')
@@ -0,0 +1,79 @@
+"""intern_transaction_titles_as_merchants
+
+Revision ID: 8e2d6b4f1a73
+Revises: 1c4f8e2a7d95
+Create Date: 2026-10-18 16:31:52.887104
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+from src.normalize import TitleNormalizer
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8e2d6b4f1a73'
+down_revision: Union[str, Sequence[str], None] = '1c4f8e2a7d95'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('merchants',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('name', sa.String(), nullable=False),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('name')
+    )
+
+    # Backfill: os títulos gravados passam pelo mesmo TitleNormalizer da importação ("Café" e "café"
+    # viram "cafe"), um merchant por forma canônica, e cada transação aponta para o seu
+    conn = op.get_bind()
+    titles = list(conn.execute(sa.text("SELECT DISTINCT title FROM transactions")).scalars())
+    canonical = dict(zip(titles, TitleNormalizer().normalize_many(titles)))
+    merchants = sa.table('merchants', sa.column('id', sa.Integer), sa.column('name', sa.String))
+    if canonical:
+        op.bulk_insert(merchants, [{'name': name} for name in sorted(set(canonical.values()))])
+    op.add_column('transactions', sa.Column('merchant_id', sa.Integer(), nullable=True))
+    if canonical:
+        merchant_ids = dict(conn.execute(sa.select(merchants.c.name, merchants.c.id)).all())
+        transactions = sa.table('transactions', sa.column('title', sa.String), sa.column('merchant_id', sa.Integer))
+        conn.execute(
+            transactions.update()
+            .where(transactions.c.title == sa.bindparam('stored_title'))
+            .values(merchant_id=sa.bindparam('merchant')),
+            [{'stored_title': title, 'merchant': merchant_ids[name]} for title, name in canonical.items()],
+        )
+
+        # As formas gravadas entram em canonical_titles, como se tivessem vindo de uma importação
+        canonical_titles = sa.table('canonical_titles', sa.column('raw_title', sa.String), sa.column('title', sa.String))
+        known = set(conn.execute(sa.select(canonical_titles.c.raw_title)).scalars())
+        seeds = [{'raw_title': title, 'title': name} for title, name in canonical.items() if title not in known]
+        if seeds:
+            op.bulk_insert(canonical_titles, seeds)
+
+    op.drop_index(op.f('ix_transactions_title'), table_name='transactions')
+    with op.batch_alter_table('transactions') as batch_op:
+        batch_op.alter_column('merchant_id', existing_type=sa.Integer(), nullable=False)
+        batch_op.create_foreign_key('fk_transactions_merchant_id_merchants', 'merchants', ['merchant_id'], ['id'])
+        batch_op.create_index(batch_op.f('ix_transactions_merchant_id'), ['merchant_id'], unique=False)
+        batch_op.drop_column('title')
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.add_column('transactions', sa.Column('title', sa.String(), nullable=True))
+    op.execute(
+        "UPDATE transactions SET title = "
+        "(SELECT merchants.name FROM merchants WHERE merchants.id = transactions.merchant_id)"
+    )
+    with op.batch_alter_table('transactions') as batch_op:
+        batch_op.alter_column('title', existing_type=sa.String(), nullable=False)
+        batch_op.drop_index(batch_op.f('ix_transactions_merchant_id'))
+        batch_op.drop_constraint('fk_transactions_merchant_id_merchants', type_='foreignkey')
+        batch_op.drop_column('merchant_id')
+    op.create_index(op.f('ix_transactions_title'), 'transactions', ['title'], unique=False)
+    op.drop_table('merchants')
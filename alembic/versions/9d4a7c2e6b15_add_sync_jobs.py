@@ -0,0 +1,47 @@
+"""add_sync_jobs
+
+Revision ID: 9d4a7c2e6b15
+Revises: 3b9e1f6c2a48
+Create Date: 2026-10-18 18:52:37.604118
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9d4a7c2e6b15'
+down_revision: Union[str, Sequence[str], None] = '3b9e1f6c2a48'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('sync_jobs',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('kind', sa.String(), nullable=False),
+    sa.Column('status', sa.String(), nullable=False),
+    sa.Column('trigger', sa.String(), nullable=False),
+    sa.Column('progress', sa.Float(), nullable=False),
+    sa.Column('message', sa.String(), nullable=True),
+    sa.Column('result', sa.String(), nullable=True),
+    sa.Column('error', sa.String(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.Column('started_at', sa.DateTime(), nullable=True),
+    sa.Column('finished_at', sa.DateTime(), nullable=True),
+    sa.Column('heartbeat_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+    # Índice único parcial: no máximo um job em andamento (queued/running) por tipo
+    op.create_index('uq_sync_jobs_active_kind', 'sync_jobs', ['kind'], unique=True,
+                    sqlite_where=sa.text("status IN ('queued', 'running')"),
+                    postgresql_where=sa.text("status IN ('queued', 'running')"))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('uq_sync_jobs_active_kind', table_name='sync_jobs')
+    op.drop_table('sync_jobs')
@@ -0,0 +1,28 @@
+"""add_transaction_title_index
+
+Revision ID: b41e6d0c9a57
+Revises: 7f3a9c1d2e84
+Create Date: 2026-10-18 10:41:03.917265
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b41e6d0c9a57'
+down_revision: Union[str, Sequence[str], None] = '7f3a9c1d2e84'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index(op.f('ix_transactions_title'), 'transactions', ['title'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_transactions_title'), table_name='transactions')
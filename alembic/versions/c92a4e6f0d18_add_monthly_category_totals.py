@@ -0,0 +1,47 @@
+"""add_monthly_category_totals
+
+Revision ID: c92a4e6f0d18
+Revises: 5d8e2f7a1b36
+Create Date: 2026-10-18 12:02:26.381745
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c92a4e6f0d18'
+down_revision: Union[str, Sequence[str], None] = '5d8e2f7a1b36'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('monthly_category_totals',
+    sa.Column('month', sa.Date(), nullable=False),
+    sa.Column('category_id', sa.Integer(), nullable=False),
+    sa.Column('total', sa.Float(), nullable=False),
+    sa.Column('count', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['category_id'], ['categories.id'], ),
+    sa.PrimaryKeyConstraint('month', 'category_id')
+    )
+
+    # Preenche o resumo com o histórico já importado
+    if op.get_bind().dialect.name == 'postgresql':
+        month = "CAST(date_trunc('month', date) AS DATE)"
+    else:
+        month = "strftime('%Y-%m-01', date)"
+    op.execute(
+        "INSERT INTO monthly_category_totals (month, category_id, total, count) "
+        f"SELECT {month}, category_id, SUM(amount), COUNT(*) FROM transactions "
+        "WHERE category_id IN (SELECT id FROM categories) "
+        f"GROUP BY {month}, category_id"
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('monthly_category_totals')
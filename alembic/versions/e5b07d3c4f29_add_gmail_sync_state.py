@@ -0,0 +1,39 @@
+"""add_gmail_sync_state
+
+Revision ID: e5b07d3c4f29
+Revises: c92a4e6f0d18
+Create Date: 2026-10-18 13:27:45.019384
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e5b07d3c4f29'
+down_revision: Union[str, Sequence[str], None] = 'c92a4e6f0d18'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('gmail_messages',
+    sa.Column('id', sa.String(), nullable=False),
+    sa.Column('history_id', sa.String(), nullable=True),
+    sa.Column('processed_at', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_table('sync_state',
+    sa.Column('key', sa.String(), nullable=False),
+    sa.Column('value', sa.String(), nullable=True),
+    sa.PrimaryKeyConstraint('key')
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('sync_state')
+    op.drop_table('gmail_messages')
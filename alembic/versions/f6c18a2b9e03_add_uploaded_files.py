@@ -0,0 +1,39 @@
+"""add_uploaded_files
+
+Revision ID: f6c18a2b9e03
+Revises: e5b07d3c4f29
+Create Date: 2026-10-18 14:10:08.772561
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f6c18a2b9e03'
+down_revision: Union[str, Sequence[str], None] = 'e5b07d3c4f29'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('uploaded_files',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('sha256', sa.String(length=64), nullable=False),
+    sa.Column('name', sa.String(), nullable=False),
+    sa.Column('drive_file_id', sa.String(), nullable=True),
+    sa.Column('size', sa.Integer(), nullable=True),
+    sa.Column('uploaded_at', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('sha256')
+    )
+    op.create_index(op.f('ix_uploaded_files_name'), 'uploaded_files', ['name'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_uploaded_files_name'), table_name='uploaded_files')
+    op.drop_table('uploaded_files')
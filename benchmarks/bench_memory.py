@@ -0,0 +1,80 @@
+"""
+Benchmark de memória do DataFrame de transações: grava N transações sintéticas
+num banco SQLite temporário e mede memory_usage(deep=True) do frame devolvido
+por src.models.get_transactions_data, comparado ao frame antigo (texto em objetos
+Python e valores float).
+
+    python -m benchmarks.bench_memory --rows 1000000
+"""
+import argparse
+import os
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+MERCHANTS = 2_000
+CATEGORIES = ['Uncategorized', 'Food', 'Transport', 'Health', 'Shopping', 'Subscriptions', 'Fuel', 'Travel']
+
+
+def populate(models, rows, seed=0):
+    rng = np.random.default_rng(seed)
+    dates = pd.Timestamp('2020-01-01') + pd.to_timedelta(rng.integers(0, 1500, rows), unit='D')
+    transactions = pd.DataFrame({
+        'date': dates.date,
+        'merchant_id': rng.integers(1, MERCHANTS + 1, rows),
+        'amount_cents': rng.integers(100, 50_000, rows),
+        'category_id': rng.integers(1, len(CATEGORIES) + 1, rows),
+    })
+    with models.engine.begin() as conn:
+        conn.execute(models.insert(models.Category), [{'name': name} for name in CATEGORIES])
+        conn.execute(models.insert(models.Merchant), [{'name': f'Estabelecimento {i:05d}'} for i in range(MERCHANTS)])
+        for offset in range(0, rows, models.BULK_CHUNK_SIZE * 10):
+            chunk = transactions.iloc[offset:offset + models.BULK_CHUNK_SIZE * 10]
+            conn.execute(models.insert(models.Transaction), chunk.to_dict('records'))
+
+
+def object_frame(df):
+    # Representação anterior: uma string Python por linha e valores em float
+    return pd.DataFrame({
+        'title': df['title'].astype(str).astype(object),
+        'date': df['date'],
+        'amount': df['amount_cents'].astype(float) / 100,
+        'category': df['category'].astype(str).astype(object),
+    })
+
+
+def report(name, df, elapsed=None):
+    size = df.memory_usage(deep=True).sum()
+    timing = f"  {elapsed:6.2f}s" if elapsed is not None else ''
+    print(f"{name:<10} {size / 2 ** 20:>10.1f} MiB  {size / len(df):>7.1f} bytes/linha{timing}")
+    return size
+
+
+def run(rows):
+    with tempfile.TemporaryDirectory() as tmp:
+        # A URL precisa estar definida antes de src.models criar o engine
+        os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(tmp, 'bench.db')}"
+        import src.models as models
+
+        models.create_tables()
+        populate(models, rows)
+        print(f"{rows} transações")
+
+        results = {}
+        for backend in ('numpy', 'pyarrow'):
+            models.query_cache.clear()
+            started = time.perf_counter()
+            df = models.get_transactions_data(dtype_backend=backend)
+            results[backend] = report(backend, df, time.perf_counter() - started)
+        results['object'] = report('object', object_frame(df))
+        models.engine.dispose()
+    return results
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rows', type=int, default=1_000_000)
+    args = parser.parse_args()
+    run(args.rows)
@@ -0,0 +1,53 @@
+"""
+Benchmark dos parsers de extrato: gera um arquivo sintético por formato
+e mede a vazão (linhas/s) de src.parsers.iter_statement.
+
+    python -m benchmarks.bench_parsers --rows 200000
+"""
+import argparse
+import os
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+from src.parsers import FORMATS, iter_statement
+
+TITLES = ['Uber Trip', 'Ifood - Parcela 1/3', 'Mercado Livre', 'Netflix.com', 'Posto Shell', 'Farmácia São João']
+
+
+def write_sample(statement_format, rows, path, seed=0):
+    rng = np.random.default_rng(seed)
+    dates = pd.Timestamp('2020-01-01') + pd.to_timedelta(rng.integers(0, 1500, rows), unit='D')
+    amounts = rng.integers(100, 50_000, rows) / 100 * statement_format.sign
+    values = {
+        'date': dates.strftime(statement_format.date_format),
+        'title': rng.choice(TITLES, rows),
+        'amount': amounts,
+    }
+    target_to_source = {target: source for source, target in statement_format.column_map.items()}
+    pd.DataFrame({target_to_source[column]: data for column, data in values.items()}).to_csv(path, index=False)
+
+
+def run(rows, chunksize):
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for name, statement_format in FORMATS.items():
+            path = os.path.join(tmp, f'{name}.csv')
+            write_sample(statement_format, rows, path)
+
+            started = time.perf_counter()
+            parsed = sum(len(chunk) for chunk in iter_statement(path, chunksize))
+            elapsed = time.perf_counter() - started
+            results.append((name, parsed, elapsed))
+            print(f"{name:<16} {parsed:>10} linhas  {elapsed:6.2f}s  {parsed / elapsed:>12,.0f} linhas/s")
+    return results
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rows', type=int, default=200_000)
+    parser.add_argument('--chunksize', type=int, default=50_000)
+    args = parser.parse_args()
+    run(args.rows, args.chunksize)
@@ -0,0 +1,177 @@
+"""
+Benchmark do pipeline completo sem subir o Streamlit: leitura do CSV, normalização,
+categorização, gravação, importação em streaming (import_file), leitura do DataFrame de
+transações, os agregados do Summary/Dashboard, a previsão por categoria e a detecção de
+cobranças fora do padrão. Cada tamanho roda num processo novo com um banco SQLite próprio,
+e o resultado (tempo e pico de memória por etapa) vai para um JSON comparável entre commits.
+
+    python -m benchmarks.bench_pipeline --rows 10000 100000 1000000 --output bench_results.json
+"""
+import argparse
+import inspect
+import json
+import multiprocessing
+import os
+import platform
+import resource
+import subprocess
+import tempfile
+import time
+import tracemalloc
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+
+from benchmarks.generate import write_statement
+
+# Palavras-chave semeadas para a etapa de categorização
+KEYWORDS = [
+    ('Transport', 'uber *trip', 'exact'),
+    ('Transport', '99 *pop', 'prefix'),
+    ('Food', 'ifood', 'prefix'),
+    ('Food', 'padaria', 'contains'),
+    ('Health', 'farmacia', 'contains'),
+    ('Health', 'drogasil', 'prefix'),
+    ('Subscriptions', 'netflix.com', 'exact'),
+    ('Subscriptions', 'spotify', 'exact'),
+    ('Fuel', 'posto', 'prefix'),
+    ('Shopping', 'amazon', 'contains'),
+]
+
+
+class Stages:
+    # Mede cada etapa: tempo de parede e, com tracemalloc, o pico de memória alocada nela
+    def __init__(self, rows, trace):
+        self.rows = rows
+        self.trace = trace
+        self.results = []
+
+    def run(self, name, func, *args):
+        if self.trace:
+            tracemalloc.reset_peak()
+            before = tracemalloc.get_traced_memory()[0]
+        started = time.perf_counter()
+        value = func(*args)
+        elapsed = time.perf_counter() - started
+        result = {'name': name, 'seconds': round(elapsed, 4), 'rows_per_s': round(self.rows / elapsed) if elapsed else None}
+        if self.trace:
+            result['peak_mb'] = round((tracemalloc.get_traced_memory()[1] - before) / 2 ** 20, 2)
+        self.results.append(result)
+        peak = f"{result['peak_mb']:>9.1f} MiB" if self.trace else ''
+        print(f"  {name:<24} {elapsed:8.3f}s {result['rows_per_s'] or 0:>12,} linhas/s{peak}", flush=True)
+        return value
+
+
+def seed_keywords(models):
+    for category_name, word, match_type in KEYWORDS:
+        category = models.get_category(category_name) or models.save_category(category_name)
+        if not models.get_keyword(word):
+            models.save_keyword(word, category.id, match_type)
+
+
+def cold(func):
+    # Ignora o cache de leituras (e a instrumentação): mede a consulta e a agregação, não o acerto no LRU
+    return inspect.unwrap(func)
+
+
+def run_size(rows, workdir, trace):
+    # Roda no processo filho: a URL do banco precisa estar definida antes do import de src.models
+    os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(workdir, f'bench_{rows}.db')}"
+    import src.anomalies
+    import src.charts
+    import src.importer
+    import src.models as models
+    from src.normalize import title_normalize
+    from src.utils import load_transactions
+
+    models.create_tables()
+    seed_keywords(models)
+    path = write_statement(rows, os.path.join(workdir, f'nubank_{rows}.csv'))
+
+    if trace:
+        tracemalloc.start()
+    stages = Stages(rows, trace)
+    print(f"{rows} linhas", flush=True)
+
+    df = stages.run('load_transactions', load_transactions, path)
+    df = stages.run('title_normalize', title_normalize, df, models.title_normalizer)
+    stages.run('categorize', lambda titles: models.get_keyword_matcher().categorize(titles), df['title'])
+    stages.run('save_transactions', models.save_transactions, df)
+    del df
+    # Caminho do upload/sync: outro extrato (títulos novos) em streaming, em vários lotes
+    other = write_statement(rows, os.path.join(workdir, f'nubank_{rows}_import.csv'), seed=1)
+    stages.run('import_file', src.importer.import_file, other, max(rows // 4, 1))
+
+    stages.run('get_transactions_data', cold(models.get_transactions_data))
+    summary = stages.run('monthly_category_totals', cold(models.get_monthly_category_totals))
+    stages.run('kpi_row', src.charts.kpi_summary, summary)
+
+    version = models.get_data_version()
+    stages.run('dashboard_aggregates', lambda: [
+        cold(src.charts.category_totals)(None, None, version),
+        cold(src.charts.top_expenses)(None, None, version),
+        cold(src.charts.monthly_totals)(None, None, version),
+    ])
+    stages.run('dashboard_figures', lambda: [
+        cold(src.charts.category_pie)(None, None, version).to_json(),
+        cold(src.charts.top_expenses_bar)(None, None, version).to_json(),
+        cold(src.charts.monthly_line)(None, None, version).to_json(),
+    ])
+    stages.run('forecast', lambda: cold(src.charts.category_forecast)(None, version))
+    # Avaliação inicial: todas as transações são novas, o pior caso da detecção incremental
+    stages.run('anomalies', lambda: src.anomalies.detect(models.get_scoring_frame(0)))
+
+    if trace:
+        tracemalloc.stop()
+    models.engine.dispose()
+    return {
+        'rows': rows,
+        # ru_maxrss é em KiB no Linux
+        'peak_rss_mb': round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+        'stages': stages.results,
+    }
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(sizes, output, trace=True):
+    import numpy
+    import pandas
+
+    report = {
+        'commit': git_commit(),
+        'timestamp': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'pandas': pandas.__version__,
+        'numpy': numpy.__version__,
+        'platform': platform.platform(),
+        'tracemalloc': trace,
+        'results': [],
+    }
+    context = multiprocessing.get_context('spawn')
+    with tempfile.TemporaryDirectory() as workdir:
+        for rows in sizes:
+            # Um processo por tamanho: banco, caches e pico de RSS não vazam entre execuções
+            with ProcessPoolExecutor(max_workers=1, mp_context=context) as executor:
+                report['results'].append(executor.submit(run_size, rows, workdir, trace).result())
+
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
+    print(f"Resultados em {output}")
+    return report
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rows', type=int, nargs='+', default=[10_000, 100_000, 1_000_000])
+    parser.add_argument('--output', default='bench_results.json')
+    # tracemalloc deixa a gravação várias vezes mais lenta; sem ele só o pico de RSS é medido
+    parser.add_argument('--no-tracemalloc', dest='trace', action='store_false')
+    args = parser.parse_args()
+    run(args.rows, args.output, args.trace)
@@ -0,0 +1,62 @@
+"""
+Perfil do cold start do app: importa main.py num processo novo (Streamlit em modo
+"bare", sem servidor) com `python -X importtime` e mostra os pacotes que mais pesam,
+além do tempo total até o fim da primeira execução do script.
+
+    python -m benchmarks.bench_startup --top 15
+"""
+import argparse
+import os
+import re
+import subprocess
+import sys
+import tempfile
+
+IMPORT_LINE = re.compile(r'^import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)')
+# Dependências que só deveriam carregar quando a funcionalidade for usada
+DEFERRED = ['plotly.express', 'googleapiclient', 'google_auth_oauthlib', 'drive_gmail_sync']
+
+TIMED_IMPORT = "import time; started = time.perf_counter(); import main; print(time.perf_counter() - started)"
+
+
+def run_main(args, database_url):
+    env = dict(os.environ, DATABASE_URL=database_url, PYTHONWARNINGS='ignore')
+    return subprocess.run(
+        [sys.executable, *args], capture_output=True, text=True, env=env, cwd=os.getcwd(), check=True
+    )
+
+
+def profile(top):
+    with tempfile.TemporaryDirectory() as tmp:
+        database_url = f"sqlite:///{os.path.join(tmp, 'startup.db')}"
+        # Primeira execução cria o banco; as medidas abaixo são de um restart com o banco já pronto
+        run_main(['-c', 'import main'], database_url)
+        elapsed = float(run_main(['-c', TIMED_IMPORT], database_url).stdout.strip().splitlines()[-1])
+        stderr = run_main(['-X', 'importtime', '-c', 'import main'], database_url).stderr
+
+    packages = {}
+    loaded = set()
+    for line in stderr.splitlines():
+        match = IMPORT_LINE.match(line)
+        if not match:
+            continue
+        _, cumulative, indent, name = match.groups()
+        loaded.add(name)
+        # Só os imports feitos diretamente por main.py: o cumulativo já inclui os submódulos
+        if len(indent) == 3:
+            packages[name] = packages.get(name, 0) + int(cumulative)
+
+    print(f"import main (imports + primeira execução do script): {elapsed * 1000:,.0f} ms")
+    print(f"{'import de main.py':<32} {'cumulativo':>12}")
+    for name, cumulative in sorted(packages.items(), key=lambda item: item[1], reverse=True)[:top]:
+        print(f"{name:<32} {cumulative / 1000:>9,.1f} ms")
+    eager = [name for name in DEFERRED if name in loaded]
+    print(f"Carregados no start sem necessidade: {', '.join(eager) if eager else 'nenhum'}")
+    return elapsed, packages, eager
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--top', type=int, default=15)
+    args = parser.parse_args()
+    profile(args.top)
@@ -0,0 +1,81 @@
+"""
+Gerador de faturas sintéticas no formato do cartão Nubank (date,title,amount).
+
+Os títulos imitam os reais: estabelecimentos com sufixos de cidade/filial, compras
+parceladas ("- Parcela 2/6"), estornos e pagamentos de fatura (valores negativos,
+descartados pelo parser). A quantidade de estabelecimentos distintos cresce com o
+tamanho do arquivo, como num histórico de vários anos.
+
+    python -m benchmarks.generate --rows 10000 100000 1000000 --out ./bench_data
+"""
+import argparse
+import os
+
+import numpy as np
+import pandas as pd
+
+MERCHANTS = [
+    'Uber *Trip', 'Uber *Eats', 'Ifood *Restaurante', '99 *Pop', 'Netflix.com', 'Spotify', 'Amazon Prime',
+    'Amazon Marketplace', 'Mercado Livre', 'Mercadopago *Loja', 'Magazine Luiza', 'Americanas', 'Shopee',
+    'Posto Shell', 'Posto Ipiranga', 'Farmácia São João', 'Drogasil', 'Panvel', 'Supermercado Zaffari',
+    'Carrefour', 'Atacadão', 'Padaria Pão Quente', 'Cafeteria Grão', 'Burger King', "McDonald's",
+    'Renner', 'C&A', 'Decathlon', 'Kabum', 'Steam Games', 'Apple.com/bill', 'Google *Youtube',
+    'Smart Fit', 'Livraria Cultura', 'Cinemark', 'Azul Linhas Aéreas', 'Latam Airlines', 'Airbnb',
+    'Booking.com', 'Estacionamento Centro', 'Pet Shop Amigo', 'Claro', 'Vivo', 'Sem Parar',
+]
+CITIES = ['Porto Alegre', 'Sao Paulo', 'Rio de Janeiro', 'Curitiba', 'Florianopolis', 'Belo Horizonte']
+
+
+def merchant_names(count, rng):
+    # Nomes base + filiais numeradas, até ter `count` estabelecimentos distintos
+    names = list(MERCHANTS)
+    while len(names) < count:
+        base = MERCHANTS[rng.integers(len(MERCHANTS))]
+        names.append(f"{base} {CITIES[rng.integers(len(CITIES))]} {len(names):04d}")
+    return np.array(names[:count], dtype=object)
+
+
+def generate_statement(rows, seed=0, start='2022-01-01', days=3 * 365):
+    rng = np.random.default_rng(seed)
+    names = merchant_names(max(len(MERCHANTS), 200 + rows // 500), rng)
+    # Poucos estabelecimentos concentram a maior parte das compras (Zipf)
+    merchant = np.minimum(rng.zipf(1.3, rows) - 1, len(names) - 1)
+    titles = names[merchant].copy()
+
+    amounts = np.round(rng.lognormal(mean=3.8, sigma=1.0, size=rows), 2).clip(0.5, 20_000)
+
+    # ~8% parceladas, ~1% estornos, ~2% pagamentos de fatura
+    kind = rng.random(rows)
+    installment = kind < 0.08
+    totals = rng.integers(2, 13, rows)
+    numbers = (rng.integers(0, 12, rows) % totals) + 1
+    titles[installment] = [
+        f"{title} - Parcela {number}/{total}"
+        for title, number, total in zip(titles[installment], numbers[installment], totals[installment])
+    ]
+    refund = (kind >= 0.08) & (kind < 0.09)
+    titles[refund] = ['Estorno de ' + title for title in titles[refund]]
+    amounts[refund] = -amounts[refund]
+    payment = (kind >= 0.09) & (kind < 0.11)
+    titles[payment] = 'Pagamento recebido'
+    amounts[payment] = -np.round(amounts[payment] * 20, 2)
+
+    dates = pd.Timestamp(start) + pd.to_timedelta(np.sort(rng.integers(0, days, rows)), unit='D')
+    return pd.DataFrame({'date': dates.strftime('%Y-%m-%d'), 'title': titles, 'amount': amounts})
+
+
+def write_statement(rows, path, seed=0):
+    generate_statement(rows, seed).to_csv(path, index=False)
+    return path
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rows', type=int, nargs='+', default=[10_000, 100_000, 1_000_000])
+    parser.add_argument('--out', default='./bench_data')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+    os.makedirs(args.out, exist_ok=True)
+    for rows in args.rows:
+        path = write_statement(rows, os.path.join(args.out, f'nubank_{rows}.csv'), args.seed)
+        print(f"{path}: {rows} linhas")
@@ -0,0 +1,181 @@
+"""
+Confere a sincronização Gmail/Drive (drive_gmail_sync.py) com serviços falsos, sem rede e sem OAuth:
+paginação da busca, historyId sem mudança, mensagens já processadas, nova tentativa após 5xx
+e arquivos já enviados (mesmo SHA-256). Roda num diretório temporário com um banco próprio:
+
+    python check_sync.py
+"""
+
+import base64
+import os
+import shutil
+import tempfile
+
+import httplib2
+from googleapiclient.errors import HttpError
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+WORKDIR = tempfile.mkdtemp(prefix='finances-sync-')
+# Antes de importar src.models: o engine é criado na importação
+os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(WORKDIR, 'finances.db')}"
+os.environ.pop('PASTA_DRIVE_ID', None)
+
+import src.models  # noqa: E402
+import drive_gmail_sync  # noqa: E402
+
+
+class FakeRequest:
+    def __init__(self, result):
+        self.result = result
+
+    def execute(self):
+        return self.result
+
+
+class FakeGmail:
+    """Imita users().getProfile/messages().list/get/attachments().get do googleapiclient."""
+
+    def __init__(self, history_id, messages, page_size=2):
+        self.history_id = history_id
+        self.inbox = messages  # {id: [(nome do arquivo, bytes)]}
+        self.page_size = page_size
+        self.list_calls = 0
+        self.downloaded = []
+
+    def users(self):
+        return self
+
+    def messages(self):
+        return self
+
+    def attachments(self):
+        return FakeAttachments(self)
+
+    def getProfile(self, userId):
+        return FakeRequest({'historyId': self.history_id})
+
+    def list(self, userId, q, pageToken=None):
+        self.list_calls += 1
+        ids = sorted(self.inbox)
+        start = int(pageToken or 0)
+        page = {'messages': [{'id': msg_id} for msg_id in ids[start:start + self.page_size]]}
+        if start + self.page_size < len(ids):
+            page['nextPageToken'] = str(start + self.page_size)
+        return FakeRequest(page)
+
+    def get(self, userId, id):
+        self.downloaded.append(id)
+        parts = [
+            {'filename': filename, 'body': {'attachmentId': f'{id}:{i}'}}
+            for i, (filename, _) in enumerate(self.inbox[id])
+        ]
+        return FakeRequest({'historyId': self.history_id, 'payload': {'parts': parts}})
+
+
+class FakeAttachments:
+    def __init__(self, gmail):
+        self.gmail = gmail
+
+    def get(self, userId, messageId, id):
+        _, data = self.gmail.inbox[messageId][int(id.split(':')[1])]
+        return FakeRequest({'data': base64.urlsafe_b64encode(data).decode()})
+
+
+class FakeUpload:
+    def __init__(self, drive, name):
+        self.drive = drive
+        self.name = name
+
+    def next_chunk(self):
+        # Responde com os status de `failures[nome]`, um por chamada, depois conclui o envio
+        statuses = self.drive.failures.get(self.name)
+        if statuses:
+            raise HttpError(httplib2.Response({'status': statuses.pop(0)}), b'')
+        self.drive.created.append(self.name)
+        return None, {'id': f'drive-{self.name}'}
+
+
+class FakeDrive:
+    """Imita files().create(...).next_chunk() do upload resumível."""
+
+    def __init__(self, failures=None):
+        self.failures = {name: list(statuses) for name, statuses in (failures or {}).items()}
+        self.created = []
+
+    def files(self):
+        return self
+
+    def create(self, body, media_body, fields):
+        return FakeUpload(self, body['name'])
+
+
+def csv_bytes(*rows):
+    lines = ['date,title,amount'] + [','.join(row) for row in rows]
+    return ('\n'.join(lines) + '\n').encode()
+
+
+def check_gmail():
+    gmail = FakeGmail('100', {
+        'm1': [('fatura-01.csv', csv_bytes(('2024-01-05', 'Padaria', '12.50')))],
+        'm2': [('fatura-02.csv', csv_bytes(('2024-02-05', 'Mercado', '80.00')))],
+        'm3': [('fatura-03.csv', csv_bytes(('2024-03-05', 'Farmacia', '30.10')))],
+    })
+    baixados = drive_gmail_sync.buscar_faturas(gmail, max_workers=2)
+    # Paginação: 3 mensagens em páginas de 2 -> duas chamadas de list
+    assert gmail.list_calls == 2, gmail.list_calls
+    assert sorted(gmail.downloaded) == ['m1', 'm2', 'm3'], gmail.downloaded
+    assert len(baixados) == 3, baixados
+
+    # historyId igual ao da última sincronização: nem lista
+    assert drive_gmail_sync.buscar_faturas(gmail) == []
+    assert gmail.list_calls == 2, gmail.list_calls
+
+    # Caixa mudou: lista de novo, mas só baixa a mensagem nova
+    gmail.history_id = '101'
+    gmail.inbox['m4'] = [('fatura-04.csv', csv_bytes(('2024-04-05', 'Livraria', '45.00')))]
+    gmail.downloaded.clear()
+    baixados = drive_gmail_sync.buscar_faturas(gmail)
+    assert gmail.downloaded == ['m4'], gmail.downloaded
+    assert baixados == [os.path.join('data', 'fatura-04.csv')], baixados
+    print('gmail: paginação, historyId e mensagens processadas ok')
+
+
+def check_drive():
+    arquivos = sorted(os.path.join('data', nome) for nome in os.listdir('data'))
+    drive = FakeDrive(failures={'fatura-01.csv': [503, 500]})
+    enviados = drive_gmail_sync.enviar_para_drive(drive, arquivos, max_workers=2, backoff_base=0)
+    # Duas falhas 5xx no primeiro arquivo, depois o envio conclui
+    assert sorted(drive.created) == [os.path.basename(arquivo) for arquivo in arquivos], drive.created
+    assert drive.failures['fatura-01.csv'] == [], drive.failures
+    assert len(enviados) == len(arquivos), enviados
+
+    # Mesmo conteúdo com outro nome: ignorado pelo hash
+    copia = os.path.join('data', 'copia-fatura-01.csv')
+    shutil.copyfile(os.path.join('data', 'fatura-01.csv'), copia)
+    drive.created.clear()
+    assert drive_gmail_sync.enviar_para_drive(drive, arquivos + [copia], backoff_base=0) == []
+    assert drive.created == [], drive.created
+
+    # Erro que não é temporário (404) não é repetido
+    drive = FakeDrive(failures={'copia-fatura-01.csv': [404]})
+    try:
+        drive_gmail_sync.enviar_arquivo(drive, copia, backoff_base=0)
+    except HttpError as e:
+        assert e.resp.status == 404
+    else:
+        raise AssertionError('404 deveria propagar')
+    assert drive.created == [], drive.created
+    print('drive: nova tentativa após 5xx e arquivos já enviados ok')
+
+
+if __name__ == '__main__':
+    os.chdir(WORKDIR)
+    try:
+        src.models.ensure_schema()
+        check_gmail()
+        check_drive()
+    finally:
+        src.models.engine.dispose()
+        os.chdir(ROOT)
+        shutil.rmtree(WORKDIR, ignore_errors=True)
+    print('ok')
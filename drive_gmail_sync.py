@@ -12,18 +12,25 @@ Requisitos:
 - token.json (gerado automaticamente após o primeiro login)
 """
 
-import pandas as pd
 import src.models
-from src.normalize import title_normalize
 import os
 import base64
+import mimetypes
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from google.auth.exceptions import RefreshError
 from google.auth.transport.requests import Request
 from google.oauth2.credentials import Credentials
 from google_auth_oauthlib.flow import InstalledAppFlow
 from googleapiclient.discovery import build
+from googleapiclient.errors import HttpError
 from googleapiclient.http import MediaFileUpload, MediaIoBaseDownload
 from dotenv import load_dotenv
-from src.utils import load_transactions
+from src.importer import import_file
+from src.instrumentation import timed
+from src.utils import file_sha256
 
 load_dotenv()
 
@@ -36,12 +43,29 @@ SCOPES = [
 # 👉 Cole aqui o ID da pasta do Drive (ex: "1A2B3C4D5E6F7G8H9")
 PASTA_DRIVE_ID = os.environ.get("PASTA_DRIVE_ID")
 
+# Quantidade de mensagens baixadas em paralelo na sincronização do Gmail
+GMAIL_MAX_WORKERS = int(os.environ.get("GMAIL_MAX_WORKERS", 4))
+
+# Chave em sync_state com o último historyId visto na caixa do Gmail
+GMAIL_HISTORY_KEY = "gmail_history_id"
+
+# Uploads simultâneos ao Drive e tamanho de cada pedaço do upload resumível (múltiplo de 256 KB)
+DRIVE_MAX_WORKERS = int(os.environ.get("DRIVE_MAX_WORKERS", 3))
+DRIVE_CHUNK_SIZE = 5 * 1024 * 1024
+DRIVE_MAX_RETRIES = 5
+# Status HTTP que valem nova tentativa com backoff exponencial
+RETRIABLE_STATUS = {429, 500, 502, 503, 504}
+
 
 # ============================================================
 # ⚙️ Função de autenticação
 # ============================================================
-def get_services():
-    """Autentica via OAuth e retorna os serviços Gmail e Drive."""
+def get_credentials(interactive=True):
+    """
+    Autentica via OAuth e retorna as credenciais (token.json / credentials.json).
+    Com interactive=False (job em segundo plano) não abre o login no navegador: sem token
+    válido, ou se a renovação falhar, levanta RuntimeError dizendo como autorizar.
+    """
     creds = None
 
     if os.path.exists("token.json"):
@@ -50,13 +74,28 @@ def get_services():
     # Se não houver token ou estiver expirado, refaz o login
     if not creds or not creds.valid:
         if creds and creds.expired and creds.refresh_token:
-            creds.refresh(Request())
-        else:
+            try:
+                creds.refresh(Request())
+            except RefreshError:
+                # Token revogado ou expirado de vez: só um novo login resolve
+                creds = None
+        if not creds or not creds.valid:
+            if not interactive:
+                raise RuntimeError(
+                    "Acesso ao Google não autorizado ou expirado. Rode `python drive_gmail_sync.py` "
+                    "uma vez no terminal para fazer o login (gera token.json) e tente de novo."
+                )
             flow = InstalledAppFlow.from_client_secrets_file("credentials.json", SCOPES)
             creds = flow.run_local_server(port=0)
         with open("token.json", "w") as token:
             token.write(creds.to_json())
 
+    return creds
+
+
+def get_services():
+    """Autentica via OAuth e retorna os serviços Gmail e Drive."""
+    creds = get_credentials()
     gmail = build("gmail", "v1", credentials=creds)
     drive = build("drive", "v3", credentials=creds)
     return gmail, drive
@@ -65,108 +104,262 @@ def get_services():
 # ============================================================
 # ✉️ Buscar e baixar anexos de fatura no Gmail
 # ============================================================
-def buscar_faturas(gmail_service, termo_busca=None):
+def listar_mensagens(gmail_service, termo_busca):
+    """Lista os IDs de todas as mensagens da busca, seguindo o nextPageToken."""
+    ids = []
+    page_token = None
+    while True:
+        results = gmail_service.users().messages().list(
+            userId="me", q=termo_busca, pageToken=page_token
+        ).execute()
+        ids.extend(msg["id"] for msg in results.get("messages", []))
+        page_token = results.get("nextPageToken")
+        if not page_token:
+            return ids
+
+
+def baixar_anexos(gmail_service, msg_id):
+    """
+    Baixa os anexos .csv de uma mensagem.
+    Retorna (msg_id, historyId, [(nome do arquivo, bytes)]).
+    """
+    msg_data = gmail_service.users().messages().get(userId="me", id=msg_id).execute()
+    partes = msg_data["payload"].get("parts", [])
+
+    anexos = []
+    for part in partes:
+        if part.get("filename", "").endswith(".csv"):
+            att_id = part["body"].get("attachmentId")
+            if not att_id:
+                continue
+
+            att = gmail_service.users().messages().attachments().get(
+                userId="me", messageId=msg_id, id=att_id
+            ).execute()
+            anexos.append((part["filename"], base64.urlsafe_b64decode(att["data"])))
+
+    return msg_id, msg_data.get("historyId"), anexos
+
+
+def importar_csv(local_path):
+    """Lê o CSV baixado em streaming, normaliza e grava as transações."""
+    try:
+        import_file(local_path)
+    except ValueError as e:
+        # Formato desconhecido ou arquivo inválido: o arquivo fica em data/ e a sincronização segue
+        print(f"Erro ao importar {local_path}: {e}")
+
+
+@timed('sync')
+def buscar_faturas(gmail_service, termo_busca=None, max_workers=GMAIL_MAX_WORKERS, service_factory=None,
+                   progress=None):
     """
     Busca e-mails com anexos .csv e baixa os arquivos localmente.
     Retorna lista com os nomes dos arquivos baixados.
+
+    Sincronização incremental:
+    - se o historyId da caixa não mudou desde a última sincronização, nada é listado;
+    - mensagens já processadas (tabela gmail_messages) não são baixadas de novo;
+    - as novas são baixadas em paralelo por até `max_workers` threads.
+
+    Os objetos de serviço do googleapiclient não são thread-safe: em produção passe
+    `service_factory` para criar um serviço por thread. Sem ele, `gmail_service` é
+    compartilhado (útil com um serviço falso em testes).
+
+    `progress(fraction, message)`, se informado, recebe o avanço dos downloads.
     """
+    progress = progress or _sem_progresso
     termo_busca = termo_busca or 'from:"@nubank.com.br" has:attachment filename:csv'
-    results = gmail_service.users().messages().list(userId="me", q=termo_busca).execute()
-    mensagens = results.get("messages", [])
 
-    if not mensagens:
-        print("Nenhum e-mail de fatura encontrado.")
+    history_id = gmail_service.users().getProfile(userId="me").execute().get("historyId")
+    if history_id and history_id == src.models.get_sync_state(GMAIL_HISTORY_KEY):
+        print("Nenhuma alteração na caixa do Gmail desde a última sincronização.")
         return []
 
-    baixados = []
+    progress(0.0, "Listando e-mails de fatura...")
+    mensagens = listar_mensagens(gmail_service, termo_busca)
+    processadas = src.models.get_processed_message_ids(mensagens)
+    novas = [msg_id for msg_id in mensagens if msg_id not in processadas]
 
-    for msg in mensagens:
-        msg_data = gmail_service.users().messages().get(userId="me", id=msg["id"]).execute()
-        partes = msg_data["payload"].get("parts", [])
+    if not novas:
+        print("Nenhum e-mail de fatura novo encontrado.")
+        src.models.set_sync_state(GMAIL_HISTORY_KEY, history_id)
+        return []
 
-        for part in partes:
-            if part.get("filename", "").endswith(".csv"):
-                att_id = part["body"].get("attachmentId")
-                if not att_id:
-                    continue
+    local = threading.local()
 
-                att = gmail_service.users().messages().attachments().get(
-                    userId="me", messageId=msg["id"], id=att_id
-                ).execute()
+    def baixar(msg_id):
+        service = gmail_service
+        if service_factory is not None:
+            if not hasattr(local, "service"):
+                local.service = service_factory()
+            service = local.service
+        return baixar_anexos(service, msg_id)
 
-                file_data = base64.urlsafe_b64decode(att["data"])
-                filename = part["filename"]
+    baixados = []
+    os.makedirs("data", exist_ok=True)
 
-                os.makedirs("data", exist_ok=True)
+    # Downloads em paralelo; gravação no banco fica na thread principal, uma mensagem por vez
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        for i, (msg_id, msg_history_id, anexos) in enumerate(executor.map(baixar, novas), 1):
+            for filename, file_data in anexos:
                 local_path = os.path.join("data", filename)
-
                 with open(local_path, "wb") as f:
                     f.write(file_data)
 
                 print(f"Arquivo CSV baixado: {filename}")
                 baixados.append(local_path)
+                importar_csv(local_path)
 
-                df = load_transactions(local_path)
-                if df is None:
-                    # tenta ler e renomear colunas do formato Nubank em português
-                    df = pd.read_csv(local_path)
-                    df.columns = [col.strip() for col in df.columns]
-                    df = df.rename(columns={"Data": "date", "Descrição": "title", "Valor": "amount"})
-                    df["date"] = pd.to_datetime(df["date"], dayfirst=True)
-
-                df = title_normalize(df)
-                src.models.save_transactions(df)
+            src.models.mark_message_processed(msg_id, msg_history_id)
+            progress(i / len(novas), f"{i}/{len(novas)} e-mail(s) processado(s)")
 
+    src.models.set_sync_state(GMAIL_HISTORY_KEY, history_id)
     return baixados
 
 
 # ============================================================
 # ☁️ Enviar arquivos ao Google Drive
 # ============================================================
-def enviar_para_drive(drive_service, arquivos):
+def enviar_arquivo(drive_service, arquivo, max_retries=DRIVE_MAX_RETRIES, backoff_base=1.0):
+    """
+    Envia um arquivo em pedaços (upload resumível), repetindo com backoff exponencial
+    os pedaços que falharem com erro temporário. Retorna (ID no Drive, tentativas extras).
+    """
+    nome = os.path.basename(arquivo)
+    file_metadata = {"name": nome}
+
+    if PASTA_DRIVE_ID:
+        file_metadata["parents"] = [PASTA_DRIVE_ID]
+
+    mimetype = mimetypes.guess_type(arquivo)[0] or "application/octet-stream"
+    media = MediaFileUpload(arquivo, mimetype=mimetype, resumable=True, chunksize=DRIVE_CHUNK_SIZE)
+    request = drive_service.files().create(body=file_metadata, media_body=media, fields="id")
+
+    retries = 0
+    response = None
+    while response is None:
+        try:
+            _, response = request.next_chunk()
+        except (HttpError, OSError) as e:
+            status = getattr(getattr(e, "resp", None), "status", None)
+            temporario = isinstance(e, OSError) or status in RETRIABLE_STATUS
+            if not temporario or retries >= max_retries:
+                raise
+            retries += 1
+            # O upload resumível continua do último pedaço confirmado
+            time.sleep(backoff_base * 2 ** (retries - 1) + random.uniform(0, backoff_base))
+
+    return response.get("id"), retries
+
+
+@timed('sync')
+def enviar_para_drive(drive_service, arquivos, max_workers=DRIVE_MAX_WORKERS, service_factory=None,
+                      backoff_base=1.0, progress=None):
     """
     Faz upload dos arquivos baixados para a pasta do Google Drive.
     Retorna lista com os IDs dos arquivos criados.
-    Serve para saber quais arquivos já foram importados e quais não
-    """
-    enviados = []
-    for arquivo in arquivos:
-        nome = os.path.basename(arquivo)
-        file_metadata = {"name": nome}
-
-        if PASTA_DRIVE_ID:
-            file_metadata["parents"] = [PASTA_DRIVE_ID]
+    Serve para saber quais arquivos já foram importados e quais não:
+    arquivos cujo conteúdo (SHA-256) ou nome já estão em uploaded_files são ignorados.
 
-        media = MediaFileUpload(arquivo, mimetype="application/pdf")
-
-        novo_arquivo = (
-            drive_service.files()
-            .create(body=file_metadata, media_body=media, fields="id")
-            .execute()
-        )
+    Como em buscar_faturas, `service_factory` cria um serviço por thread;
+    sem ele `drive_service` é compartilhado (ex: um serviço falso em testes).
+    """
+    progress = progress or _sem_progresso
+    inicio = time.perf_counter()
 
-        enviados.append(novo_arquivo.get("id"))
-        print(f"Arquivo enviado ao Drive: {nome} (ID: {novo_arquivo.get('id')})")
+    hashes = {}
+    for arquivo in arquivos:
+        hashes.setdefault(file_sha256(arquivo), arquivo)
+    hashes_enviados, nomes_enviados = src.models.get_uploaded_files(
+        hashes, [os.path.basename(arquivo) for arquivo in hashes.values()]
+    )
+    pendentes = {
+        sha256: arquivo for sha256, arquivo in hashes.items()
+        if sha256 not in hashes_enviados and os.path.basename(arquivo) not in nomes_enviados
+    }
+    ignorados = len(arquivos) - len(pendentes)
+
+    local = threading.local()
+
+    def enviar(arquivo):
+        service = drive_service
+        if service_factory is not None:
+            if not hasattr(local, "service"):
+                local.service = service_factory()
+            service = local.service
+        return enviar_arquivo(service, arquivo, backoff_base=backoff_base)
 
+    enviados = []
+    total_bytes = 0
+    total_retries = 0
+    # Uploads em paralelo; o registro no banco fica na thread principal
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = {executor.submit(enviar, arquivo): sha256 for sha256, arquivo in pendentes.items()}
+        for future in as_completed(futures):
+            sha256 = futures[future]
+            arquivo = pendentes[sha256]
+            nome = os.path.basename(arquivo)
+            file_id, retries = future.result()
+            size = os.path.getsize(arquivo)
+
+            src.models.save_uploaded_file(sha256, nome, file_id, size)
+            enviados.append(file_id)
+            total_bytes += size
+            total_retries += retries
+            print(f"Arquivo enviado ao Drive: {nome} (ID: {file_id})")
+            progress(len(enviados) / len(pendentes), f"{len(enviados)}/{len(pendentes)} arquivo(s) enviado(s) ao Drive")
+
+    elapsed = time.perf_counter() - inicio
+    throughput = total_bytes / elapsed / 1024 if elapsed > 0 else 0
+    print(
+        f"Drive: {len(enviados)} enviado(s), {ignorados} já existente(s), "
+        f"{total_bytes / 1024:,.1f} KB em {elapsed:.2f}s ({throughput:,.1f} KB/s), "
+        f"{total_retries} nova(s) tentativa(s)"
+    )
     return enviados
 
 
 # ============================================================
 # 🚀 Função principal — para usar no Streamlit
 # ============================================================
-def sincronizar_faturas():
+def _sem_progresso(fraction, message=None):
+    pass
+
+
+def _etapa(progress, inicio, fim):
+    # Reescala o progresso de uma etapa (0..1) para o trecho [inicio, fim] da sincronização inteira
+    return lambda fraction, message=None: progress(inicio + (fim - inicio) * fraction, message)
+
+
+@timed('sync')
+def sincronizar_faturas(progress=None, interactive=True):
     """
     1. Autentica Gmail + Drive
     2. Busca faturas por e-mail
     3. Envia automaticamente para o Drive
+
+    `progress(fraction, message)` recebe o avanço geral (usado pelo job em segundo plano).
+    O job passa interactive=False: sem credenciais válidas ele falha na hora em vez de
+    esperar um login no navegador (ver get_credentials).
     """
-    gmail, drive = get_services()
-    baixados = buscar_faturas(gmail)
+    progress = progress or _sem_progresso
+    progress(0.0, "Autenticando no Google...")
+    creds = get_credentials(interactive)
+    gmail = build("gmail", "v1", credentials=creds)
+    drive = build("drive", "v3", credentials=creds)
+    baixados = buscar_faturas(
+        gmail, service_factory=lambda: build("gmail", "v1", credentials=creds),
+        progress=_etapa(progress, 0.05, 0.7),
+    )
 
     if not baixados:
         return "Nenhuma nova fatura encontrada no Gmail."
 
-    enviados = enviar_para_drive(drive, baixados)
+    enviados = enviar_para_drive(
+        drive, baixados, service_factory=lambda: build("drive", "v3", credentials=creds),
+        progress=_etapa(progress, 0.7, 1.0),
+    )
     return f"{len(baixados)} fatura(s) baixada(s) e {len(enviados)} enviada(s) ao Google Drive com sucesso!"
 
 
@@ -1,32 +1,54 @@
 import streamlit as st
 import pandas as pd
-import plotly.express as px
-from src.normalize import title_normalize
+import src.anomalies
+import src.charts
+import src.importer
+import src.jobs
 import src.models
 import src.utils
-from drive_gmail_sync import sincronizar_faturas
+from src.instrumentation import recorder, span, timed
+import math
+import os
 import time
 
-src.models.create_tables()
+# Confere as migrations e avalia os alertas pendentes uma vez por processo (no-op nos reruns seguintes)
+src.models.ensure_schema()
+src.anomalies.backfill()
 st.set_page_config(page_title="Simple Finance App", page_icon="💰", layout="wide")
 
-def display_kpi_row(df):
-    total = df["amount"].sum()
-    count = len(df)
-    months = df["date"].dt.to_period("M").nunique()
-    avg_monthly = total / months if months > 0 else 0
-    top_cat = (
-        df.groupby("category")["amount"].sum().idxmax()
-        if not df.empty else "—"
-    )
+VIEWS = ["Summary", "Dashboard", "Forecast", "Categories", "Upload"]
+# Linhas por página no editor de transações
+EDITOR_PAGE_SIZE = 100
+# Aba "Performance" escondida: aparece com ?perf=1 na URL ou SHOW_PERFORMANCE_PANEL=1
+SHOW_PERFORMANCE_PANEL = os.getenv("SHOW_PERFORMANCE_PANEL", "0") == "1"
 
-    c1, c2, c3, c4 = st.columns(4)
-    c1.metric("Total Spent", f"R$ {total:,.2f}")
-    c2.metric("Transactions", count)
-    c3.metric("Monthly Average", f"R$ {avg_monthly:,.2f}")
-    c4.metric("Top Category", top_cat)
+# Sincronização de faturas em segundo plano; SYNC_INTERVAL_MINUTES > 0 liga a execução periódica
+SYNC_JOB = "gmail_sync"
+SYNC_INTERVAL_MINUTES = int(os.getenv("SYNC_INTERVAL_MINUTES", "0"))
+# Intervalo (s) entre atualizações da tela de Upload enquanto uma sincronização roda
+SYNC_POLL_SECONDS = 2
+
+def run_invoice_sync(progress):
+    # As bibliotecas do Google só carregam quando a primeira sincronização roda
+    from drive_gmail_sync import sincronizar_faturas
+    # Sem login no navegador dentro da thread do runner: sem token válido o job falha com a instrução
+    return sincronizar_faturas(progress, interactive=False)
 
+src.jobs.runner.register(SYNC_JOB, run_invoice_sync)
+if SYNC_INTERVAL_MINUTES > 0:
+    src.jobs.runner.schedule(SYNC_JOB, SYNC_INTERVAL_MINUTES * 60)
 
+@timed('render')
+def display_kpi_row(summary):
+    kpis = src.charts.kpi_summary(summary)
+
+    c1, c2, c3, c4 = st.columns(4)
+    c1.metric("Total Spent", f"R$ {kpis['total']:,.2f}")
+    c2.metric("Transactions", kpis["count"])
+    c3.metric("Monthly Average", f"R$ {kpis['avg_monthly']:,.2f}")
+    c4.metric("Top Category", kpis["top_category"])
+
+@timed('render')
 def save_input_categories(categories):
     # Checa se precisa limpar o input ANTES de mostrá-lo
     if "clear_new_category" in st.session_state and st.session_state["clear_new_category"]:
@@ -69,42 +91,48 @@ def save_input_categories(categories):
 def add_category_to_transaction(edited_df, credit_df):
     save_button = st.button("Apply Changes", type="primary")
     if save_button:
-        for idx, row in edited_df.iterrows():
-            new_category = row["category"]
-            if new_category == credit_df.at[idx, "category"]:
-                continue
-
-            title = row["title"]
-            credit_df.at[idx, "category"] = new_category
-            keyword = src.models.add_keyword_to_category(new_category, title)
-            src.models.update_transactions(keyword)
+        # Compara o editor com os dados originais de uma vez só e aplica tudo num único rerun
+        changed = edited_df["category"].ne(credit_df["category"])
+        changes = edited_df.loc[changed, ["title", "category"]]
+        if not changes.empty:
+            src.models.recategorize_transactions(changes)
             st.rerun()
 
 def initialize_session_state():
-    if "last_uploaded_filename" not in st.session_state:
-        st.session_state.last_uploaded_filename = None
+    if "last_upload_id" not in st.session_state:
+        st.session_state.last_upload_id = None
+        st.session_state.upload_error = None
 
+@timed('render')
 def handle_file_upload():
     uploaded_file = st.file_uploader("Upload your transaction CSV file", type=["csv"])
     if uploaded_file is not None:
-        df = src.utils.load_transactions(uploaded_file)
-        df = title_normalize(df)
-        src.models.save_transactions(df)
-        df = src.models.get_transactions_data()
-        st.write('Last 10 transactions from file')
-        st.dataframe(df.tail(10),
+        # Cada arquivo enviado é importado uma vez só: os reruns seguintes (ex: o polling do
+        # sync) não releem nem recalculam o hash de um arquivo que continua no uploader
+        if uploaded_file.file_id != st.session_state.last_upload_id:
+            st.session_state.last_upload_id = uploaded_file.file_id
+            try:
+                src.importer.import_file(uploaded_file)
+                st.session_state.upload_error = None
+            except Exception as e:
+                st.session_state.upload_error = f"Error processing file: {str(e)}"
+            else:
+                st.rerun()
+        if st.session_state.upload_error:
+            st.error(st.session_state.upload_error)
+            return
+        df = src.models.get_transactions_page(page_size=10)
+        st.write('Last 10 transactions')
+        st.dataframe(src.charts.to_reais(df),
             column_order=["title", "date", "amount", "category"],
             use_container_width=True,
             hide_index=True
         )
 
-        if uploaded_file.name != st.session_state.last_uploaded_filename:
-            st.session_state.last_uploaded_filename = uploaded_file.name
-            st.rerun()
-
-def display_group_by_month(df):
-    df['date'] = pd.to_datetime(df['date'])
-    monthly_summary = df.groupby(df['date'].dt.to_period('M'))['amount'].sum().reset_index()
+def display_group_by_month(summary):
+    monthly_summary = src.charts.to_reais(
+        summary.groupby(summary['month'].dt.to_period('M'))['amount_cents'].sum().reset_index()
+    )
     st.dataframe(
         monthly_summary,
         column_config={
@@ -114,19 +142,33 @@ def display_group_by_month(df):
         hide_index=True
     )
 
-def display_years_tab(df):
+@timed('render')
+def display_years_tab(summary):
     st.subheader("Expenses per Month")
-    years = df["date"].dt.year.unique()
+    years = summary["month"].dt.year.unique()
     if len(years) > 0:
         tabs = st.tabs([str(year) for year in years])
         for tab, year in zip(tabs, years):
             with tab:
-                display_group_by_month(df[df["date"].dt.year == year])
+                display_group_by_month(summary[summary["month"].dt.year == year])
     else:
         st.write("No data available.")
 
-def display_expenses(df):
-    display_kpi_row(df)
+def select_page(total):
+    pages = max(1, math.ceil(total / EDITOR_PAGE_SIZE))
+    # O valor do widget vem só da sessão (sem value=): um período menor pode ter menos
+    # páginas que a página guardada, e o ajuste aqui não gera o aviso do Streamlit
+    st.session_state["editor_page"] = min(st.session_state.get("editor_page", 1), pages)
+    col_page, col_info = st.columns([0.25, 0.75])
+    with col_page:
+        page = st.number_input("Page", min_value=1, max_value=pages, step=1, key="editor_page")
+    with col_info:
+        st.caption(f"{total} transactions · page {page} of {pages}")
+    return page - 1
+
+@timed('render')
+def display_expenses(summary, date_range):
+    display_kpi_row(summary)
     st.divider()
 
     col_editor, col_summary = st.columns([2, 1])
@@ -135,8 +177,16 @@ def display_expenses(df):
 
     with col_editor:
         st.subheader("Transactions")
+        total = src.models.count_transactions(date_range['start_dt'], date_range['end_dt'])
+        page = select_page(total)
+        # Só a página atual sai do banco e vai para o navegador
+        df = src.models.get_transactions_page(
+            date_range['start_dt'], date_range['end_dt'], page=page, page_size=EDITOR_PAGE_SIZE
+        )
+        # O editor trabalha com texto livre, não com as colunas categóricas do DataFrame compacto
+        credit_df = src.charts.to_reais(df).astype({"title": str, "category": str})
         edited_df = st.data_editor(
-            df,
+            credit_df,
             column_config={
                 "title": st.column_config.TextColumn("Description"),
                 "date": st.column_config.DateColumn("Date", format="DD/MM/YYYY"),
@@ -148,16 +198,17 @@ def display_expenses(df):
             },
             hide_index=True,
             use_container_width=True,
-            key="category_editor"
+            # Uma chave por página: edições pendentes não passam para as linhas de outra página
+            key=f"category_editor_{page}"
         )
-        add_category_to_transaction(edited_df, df)
+        add_category_to_transaction(edited_df, credit_df)
 
     with col_summary:
         st.subheader("By Category")
-        category_totals = df.groupby("category")["amount"].sum().reset_index()
-        category_totals = category_totals.sort_values("amount", ascending=False)
         st.dataframe(
-            category_totals,
+            src.charts.category_totals(
+                date_range['start_dt'], date_range['end_dt'], src.models.get_data_version()
+            ),
             column_config={
                 "category": st.column_config.TextColumn("Category"),
                 "amount": st.column_config.NumberColumn("Total", format="R$%.2f"),
@@ -167,8 +218,9 @@ def display_expenses(df):
         )
 
     st.divider()
-    display_years_tab(df)
+    display_years_tab(summary)
 
+@timed('render')
 def show_sidebar_filter():
     with st.sidebar:
         st.title("Filters")
@@ -183,101 +235,310 @@ def show_sidebar_filter():
         }
         return date_range
 
-def filter_transactions(df, date_range):
-    if df is not None:
-        df = df[(df['date'] >= date_range['start_dt']) & (df['date'] <= date_range['end_dt'])]
+def plot(figure):
+    # Serialização da figura para o navegador, medida à parte da construção
+    with span("st.plotly_chart", "plotly"):
+        st.plotly_chart(figure, use_container_width=True)
 
-    return df
-
-def show_dashboards(df):
-    display_kpi_row(df)
+@timed('render')
+def show_dashboards(summary, date_range):
+    display_kpi_row(summary)
     st.divider()
 
+    # Agregados e figuras vêm do cache por (período, versão dos dados)
+    period = (date_range['start_dt'], date_range['end_dt'], src.models.get_data_version())
+
     col_pie, col_bar = st.columns(2)
 
     with col_pie:
-        category_totals = df.groupby("category")["amount"].sum().reset_index()
-        category_totals = category_totals.sort_values("amount", ascending=False)
-        fig_pie = px.pie(
-            category_totals,
-            values="amount",
-            names="category",
-            title="Expenses by Category",
-            hole=0.35,
-        )
-        fig_pie.update_traces(textposition="inside", textinfo="percent+label")
-        fig_pie.update_layout(showlegend=False, margin=dict(t=40, b=0, l=0, r=0))
-        st.plotly_chart(fig_pie, use_container_width=True)
+        plot(src.charts.category_pie(*period))
 
     with col_bar:
-        top_expenses = df.groupby("title", as_index=False)["amount"].sum()
-        top_expenses["abs_amount"] = top_expenses["amount"].abs()
-        top_expenses = top_expenses.nlargest(10, "abs_amount").sort_values("abs_amount")
-        fig_bar = px.bar(
-            top_expenses,
-            x="abs_amount",
-            y="title",
-            orientation="h",
-            title="Top 10 Expenses by Title",
-            labels={"abs_amount": "Amount (R$)", "title": ""},
-            text_auto=".2f",
+        plot(src.charts.top_expenses_bar(*period))
+
+    st.divider()
+
+    plot(src.charts.monthly_line(*period))
+
+    st.divider()
+    show_unusual_charges(period)
+
+# Título, coluna de referência e legenda de cada tipo de alerta
+FLAG_SECTIONS = {
+    "amount_outlier": ("Above usual amount", "Usual", "Well above the average of the previous charges from the same place."),
+    "duplicate": ("Possible duplicates", "Previous", "Same description and amount charged again on the same day."),
+    "new_subscription": ("New subscriptions", "Previous", "Third monthly charge in a row with a similar amount."),
+}
+
+@timed('render')
+def show_unusual_charges(period):
+    st.subheader("Unusual Charges")
+    flags = src.charts.unusual_charges(*period)
+    if flags.empty:
+        st.caption("Nothing unusual in this period.")
+        return
+    counts = flags["kind"].value_counts()
+    for column, (kind, (label, _, _)) in zip(st.columns(len(FLAG_SECTIONS)), FLAG_SECTIONS.items()):
+        column.metric(label, int(counts.get(kind, 0)))
+
+    for kind, (label, expected_label, caption) in FLAG_SECTIONS.items():
+        rows = flags[flags["kind"] == kind]
+        if rows.empty:
+            continue
+        with st.expander(f"{label} ({len(rows)})"):
+            st.caption(caption)
+            st.dataframe(
+                rows,
+                column_order=["date", "title", "category", "amount", "expected"],
+                column_config={
+                    "date": st.column_config.DateColumn("Date", format="DD/MM/YYYY"),
+                    "title": st.column_config.TextColumn("Description"),
+                    "category": st.column_config.TextColumn("Category"),
+                    "amount": st.column_config.NumberColumn("Amount", format="R$%.2f"),
+                    "expected": st.column_config.NumberColumn(expected_label, format="R$%.2f"),
+                },
+                use_container_width=True,
+                hide_index=True,
+            )
+
+BUDGET_MESSAGES = {
+    "over": st.error,
+    "at_risk": st.warning,
+    "warning": st.info,
+}
+
+@timed('render')
+def display_budget_alerts(alerts, today):
+    st.subheader("Budgets this month")
+    if alerts.empty:
+        st.caption("No budgets defined yet. Set monthly limits below.")
+        return
+    current = alerts[alerts["month"] == today.to_period("M").to_timestamp()]
+    for row in current[current["status"] != "ok"].itertuples():
+        BUDGET_MESSAGES[row.status](
+            f"**{row.category}**: R$ {row.spent_cents / 100:,.2f} spent of R$ {row.limit_cents / 100:,.2f}"
+            f" · projected R$ {row.projected_cents / 100:,.2f} ({row.usage:.0%})"
+        )
+    if (current["status"] == "ok").all():
+        st.success("All categories within budget.")
+
+    upcoming = alerts[(alerts["month"] > today) & (alerts["status"] != "ok")]
+    if not upcoming.empty:
+        st.caption("Upcoming months over the alert threshold")
+        st.dataframe(
+            upcoming.assign(
+                forecast=upcoming["forecast_cents"] / 100, limit=upcoming["limit_cents"] / 100
+            )[["month", "category", "forecast", "limit", "usage"]],
+            column_config={
+                "month": st.column_config.DateColumn("Month", format="MM/YYYY"),
+                "forecast": st.column_config.NumberColumn("Forecast", format="R$%.2f"),
+                "limit": st.column_config.NumberColumn("Budget", format="R$%.2f"),
+                "usage": st.column_config.ProgressColumn("Usage", format="%.2f", min_value=0, max_value=2),
+            },
+            use_container_width=True,
+            hide_index=True,
         )
-        fig_bar.update_layout(margin=dict(t=40, b=0, l=0, r=0))
-        st.plotly_chart(fig_bar, use_container_width=True)
 
+@timed('render')
+def edit_budgets():
+    st.subheader("Monthly Budgets")
+    categories = src.models.get_categories()[["name"]].rename(columns={"name": "category"})
+    budgets = categories.merge(src.models.get_budgets(), on="category", how="left")
+    # Editor em reais e percentual; o banco guarda centavos e fração
+    editable = pd.DataFrame({
+        "category": budgets["category"],
+        "limit": budgets["limit_cents"] / 100,
+        "alert": budgets["alert_ratio"].fillna(src.models.DEFAULT_ALERT_RATIO) * 100,
+    })
+    edited = st.data_editor(
+        editable,
+        column_config={
+            "category": st.column_config.TextColumn("Category", disabled=True),
+            "limit": st.column_config.NumberColumn("Monthly limit", format="R$%.2f", min_value=0),
+            "alert": st.column_config.NumberColumn("Alert at (%)", format="%.0f%%", min_value=1, max_value=100),
+        },
+        hide_index=True,
+        use_container_width=True,
+        key="budget_editor",
+    )
+    if st.button("Save Budgets", type="primary"):
+        changed = edited[edited["limit"].ne(editable["limit"]) | edited["alert"].ne(editable["alert"])]
+        # NaN != NaN: linhas sem limite antes e depois não contam como mudança
+        changed = changed[~(changed["limit"].isna() & editable.loc[changed.index, "limit"].isna())]
+        if not changed.empty:
+            src.models.save_budgets(pd.DataFrame({
+                "category": changed["category"],
+                "limit_cents": (changed["limit"] * 100).round().astype("Int64"),
+                "alert_ratio": changed["alert"] / 100,
+            }))
+            st.rerun()
+
+@timed('render')
+def show_installments(today, version):
+    st.subheader("Installments")
+    purchases = src.charts.open_installments(today, version)
+    if purchases.empty:
+        st.caption("No open installment purchases.")
+        return
+    c1, c2 = st.columns(2)
+    c1.metric("Open purchases", len(purchases))
+    c2.metric("Still to pay", f"R$ {purchases['remaining'].sum():,.2f}")
+    plot(src.charts.installments_bar(today, version))
+    st.dataframe(
+        purchases,
+        column_config={
+            "title": st.column_config.TextColumn("Description"),
+            "category": st.column_config.TextColumn("Category"),
+            "purchase_month": st.column_config.DateColumn("Purchased", format="MM/YYYY"),
+            "installment": st.column_config.TextColumn("Paid"),
+            "amount": st.column_config.NumberColumn("Installment", format="R$%.2f"),
+            "remaining": st.column_config.NumberColumn("Remaining", format="R$%.2f"),
+        },
+        use_container_width=True,
+        hide_index=True,
+    )
+
+@timed('render')
+def show_forecast():
+    # Projeção e orçamentos usam o histórico inteiro; o período da barra lateral não se aplica
+    today = pd.Timestamp.today().normalize()
+    version = src.models.get_data_version()
+
+    display_budget_alerts(src.charts.budget_alerts(today, version), today)
+    st.divider()
+
+    plot(src.charts.forecast_line(today, version))
+    st.subheader("Forecast by Category")
+    st.caption("Moving average of recent months, adjusted for seasonality when there are two or more years of history.")
+    table = src.charts.forecast_table(today, version)
+    st.dataframe(
+        table,
+        column_config={
+            "category": st.column_config.TextColumn("Category"),
+            **{month: st.column_config.NumberColumn(month, format="R$%.2f") for month in table.columns[1:]},
+        },
+        use_container_width=True,
+        hide_index=True,
+    )
     st.divider()
+    show_installments(today, version)
+    st.divider()
+    edit_budgets()
+
 
-    monthly = df.copy()
-    monthly["month"] = monthly["date"].dt.to_period("M").dt.to_timestamp()
-    monthly_totals = monthly.groupby("month")["amount"].sum().reset_index()
-    fig_line = px.line(
-        monthly_totals,
-        x="month",
-        y="amount",
-        title="Monthly Spending Trend",
-        labels={"month": "Month", "amount": "Total (R$)"},
-        markers=True,
+def sync_running(job):
+    return job is not None and job["status"] in src.models.ACTIVE_JOB_STATUSES
+
+def show_sync_indicator():
+    # Só um aviso na barra lateral; as outras visões não ficam esperando a sincronização
+    job = src.models.get_latest_job(SYNC_JOB)
+    if sync_running(job):
+        st.sidebar.caption(f"🔄 Syncing invoices… {job['progress']:.0%}")
+
+def start_sync():
+    _, created = src.jobs.runner.submit(SYNC_JOB)
+    st.session_state["sync_already_running"] = not created
+
+@timed('render')
+def show_sync_status():
+    # Callback roda uma vez por clique, antes do script; os reruns de acompanhamento não reenviam o job
+    st.button(
+        "🔄 Fetch invoices from Gmail and send to Drive",
+        on_click=start_sync,
+        disabled=sync_running(src.models.get_latest_job(SYNC_JOB)),
     )
-    fig_line.update_layout(margin=dict(t=40, b=0, l=0, r=0))
-    st.plotly_chart(fig_line, use_container_width=True)
+    if st.session_state.pop("sync_already_running", False):
+        st.info("A sync is already in progress.")
+
+    job = src.models.get_latest_job(SYNC_JOB)
+    running = sync_running(job)
+
+    if job is None:
+        return
+    if running:
+        st.progress(job["progress"], text=job["message"] or "Waiting to start...")
+        st.caption(f"Started {job['created_at']:%d/%m/%Y %H:%M:%S} ({job['trigger']})")
+    elif job["status"] == src.models.JOB_SUCCEEDED:
+        st.success(job["result"] or "Sync complete!")
+        st.caption(f"Last sync: {job['finished_at']:%d/%m/%Y %H:%M:%S} ({job['trigger']})")
+    else:
+        st.error(f"Last sync failed: {job['error']}")
 
+    if running:
+        # Atualiza o progresso a cada SYNC_POLL_SECONDS; o sleep não é interrompível, então uma
+        # interação do usuário durante a espera só é atendida quando ela termina
+        time.sleep(SYNC_POLL_SECONDS)
+        st.rerun()
+
+def show_performance():
+    run = st.session_state.get("last_run")
+    if run is None:
+        st.info("No rerun recorded yet.")
+    else:
+        st.subheader(f"Last rerun: {run.duration_ms:,.1f} ms")
+        col_kinds, col_cache = st.columns([2, 1])
+        with col_kinds:
+            st.dataframe(run.breakdown(), use_container_width=True, hide_index=True)
+        with col_cache:
+            stats = src.models.get_cache_stats()
+            st.metric("Query cache hit rate", f"{stats['hit_rate']:.0%}")
+            st.metric("Cached entries", stats["entries"])
+        st.dataframe(run.frame(), use_container_width=True, hide_index=True)
+        if run.dropped:
+            st.caption(f"{run.dropped} spans not recorded (limit per rerun reached)")
+
+    st.subheader("Slowest queries")
+    st.dataframe(recorder.slowest(), use_container_width=True, hide_index=True)
+    st.download_button(
+        "Export spans (JSON)",
+        recorder.export_json(run),
+        file_name="performance.json",
+        mime="application/json",
+    )
 
 def main():
+    with recorder.run("rerun") as run:
+        try:
+            # Importações feitas por outro processo (CLI) invalidam o cache antes de desenhar
+            src.models.refresh_external_writes()
+            render()
+        finally:
+            src.models.close_session()
+            # O painel de performance mostra sempre o rerun anterior
+            st.session_state["last_run"] = run
+
+def render():
     st.title("Personal Finance Dashboard")
     initialize_session_state()
     date_range = show_sidebar_filter()
-    df = src.models.get_transactions_data()
-    df = filter_transactions(df, date_range)
+    show_sync_indicator()
 
-    tab_summary, tab_dash, tab_categ, tab_upload = st.tabs(
-        ["Summary", "Dashboard", "Categories", "Upload"]
-    )
+    # Só a visão ativa é calculada; com st.tabs todas as abas rodariam a cada rerun
+    views = VIEWS + ["Performance"] if SHOW_PERFORMANCE_PANEL or st.query_params.get("perf") == "1" else VIEWS
+    view = st.radio("View", views, horizontal=True, key="active_view", label_visibility="collapsed")
 
-    with tab_summary:
-        if df is not None and len(df) > 0:
-            display_expenses(df)
-        else:
+    if view in ("Summary", "Dashboard"):
+        summary = src.models.get_monthly_category_totals(date_range['start_dt'], date_range['end_dt'])
+        if summary.empty:
             st.warning("No data available for this period. Please upload a CSV file.")
-
-    with tab_dash:
-        if df is not None and len(df) > 0:
-            show_dashboards(df)
+        elif view == "Summary":
+            display_expenses(summary, date_range)
         else:
-            st.warning("No data available for this period. Please upload a CSV file.")
+            show_dashboards(summary, date_range)
 
-    with tab_categ:
+    elif view == "Forecast":
+        show_forecast()
+
+    elif view == "Performance":
+        show_performance()
+
+    elif view == "Categories":
         categories = src.models.get_categories()
         save_input_categories(categories)
 
-    with tab_upload:
+    else:
         handle_file_upload()
         st.divider()
-        if st.button("🔄 Fetch invoices from Gmail and send to Drive"):
-            with st.spinner("Fetching and syncing invoices..."):
-                resultado = sincronizar_faturas()
-                st.success(resultado)
-                st.toast("Sync complete!")
-                time.sleep(2)
-                st.rerun()
+        show_sync_status()
 
 main()
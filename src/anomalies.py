@@ -0,0 +1,159 @@
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+import src.models
+from src.instrumentation import timed
+
+# Cobranças anteriores do mesmo título usadas na média/desvio móveis
+OUTLIER_WINDOW = 12
+# Mínimo de cobranças anteriores para comparar com a "norma" do estabelecimento
+OUTLIER_MIN_HISTORY = 3
+# Fora do padrão: acima de média + OUTLIER_Z desvios e pelo menos OUTLIER_MIN_RATIO x a média
+OUTLIER_Z = 3.0
+OUTLIER_MIN_RATIO = 1.5
+# Assinatura: cobranças a cada 25-35 dias com variação de até 10% no valor
+SUBSCRIPTION_GAP_DAYS = (25, 35)
+SUBSCRIPTION_TOLERANCE = 0.10
+SUBSCRIPTION_MIN_CHARGES = 3
+
+OUTLIER = 'amount_outlier'
+DUPLICATE = 'duplicate'
+NEW_SUBSCRIPTION = 'new_subscription'
+FLAG_COLUMNS = ['transaction_id', 'kind', 'score', 'expected_cents']
+
+_score_lock = threading.Lock()
+_backfilled = False
+
+
+def _prepare(df):
+    # Ordem cronológica dentro de cada título; compras parceladas e estornos ficam de fora
+    charges = df[df['amount_cents'] > 0]
+    if 'installment' in charges:
+        charges = charges[~charges['installment']]
+    sort = ['title', 'date', 'id'] if 'id' in charges else ['title', 'date']
+    return charges.sort_values(sort, kind='stable')
+
+
+def _flags(charges, mask, kind, score, expected):
+    return pd.DataFrame({
+        'transaction_id': charges.loc[mask, 'id'].to_numpy(),
+        'kind': kind,
+        'score': np.round(np.asarray(score)[mask.to_numpy()], 3),
+        'expected_cents': np.rint(np.asarray(expected)[mask.to_numpy()]).astype('int64'),
+    })
+
+
+def amount_outliers(charges, window=OUTLIER_WINDOW):
+    """
+    Valor muito acima da norma do título: média e desvio das `window` cobranças anteriores
+    (janela móvel por título com somas acumuladas do groupby, sem laço por título).
+    Retorna (máscara, valor / média, média).
+    """
+    amount = charges['amount_cents'].astype('float64')
+    group = charges['title']
+    grouped = pd.DataFrame({'sum': amount, 'squares': amount ** 2, 'count': 1.0}).groupby(group, observed=True)
+    totals = grouped.cumsum()
+    # Soma das cobranças anteriores dentro da janela: acumulado até a anterior menos o de `window` atrás
+    before = totals.groupby(group, observed=True).shift(1).fillna(0)
+    dropped = totals.groupby(group, observed=True).shift(window + 1).fillna(0)
+    rolling = before - dropped
+
+    count = rolling['count'].to_numpy()
+    with np.errstate(invalid='ignore', divide='ignore'):
+        mean = rolling['sum'].to_numpy() / count
+        std = np.sqrt(np.maximum(rolling['squares'].to_numpy() / count - mean ** 2, 0))
+        ratio = amount.to_numpy() / mean
+    mask = (
+        (count >= OUTLIER_MIN_HISTORY)
+        & (amount.to_numpy() > mean + OUTLIER_Z * std)
+        & (ratio >= OUTLIER_MIN_RATIO)
+    )
+    return pd.Series(mask, index=charges.index), ratio, mean
+
+
+def duplicate_charges(charges):
+    """
+    Mesma cobrança lançada de novo: mesmo título e valor no mesmo dia. Em dias diferentes
+    não conta (um café ou uma passagem diária de mesmo valor é normal).
+    A primeira fica sem alerta; a repetida recebe score = quantas vezes apareceu no dia.
+    """
+    repeat = charges.groupby(['title', 'amount_cents', 'date'], observed=True, sort=False).cumcount()
+    return repeat > 0, (repeat + 1).to_numpy(dtype=float), charges['amount_cents'].to_numpy()
+
+
+def new_subscriptions(charges, min_charges=SUBSCRIPTION_MIN_CHARGES):
+    """
+    Assinatura nova: a primeira vez que um título completa `min_charges` cobranças seguidas
+    com intervalo mensal e valor estável. O alerta vai na cobrança que completa a série;
+    títulos que já tiveram uma série antes não são marcados de novo.
+    """
+    grouped = charges.groupby('title', observed=True)
+    gap = grouped['date'].diff().dt.days
+    previous = grouped['amount_cents'].shift(1)
+    low, high = SUBSCRIPTION_GAP_DAYS
+    monthly = (
+        gap.between(low, high)
+        & ((charges['amount_cents'] - previous).abs() <= SUBSCRIPTION_TOLERANCE * previous)
+    )
+    # Tamanho da sequência mensal atual: reinicia a cada quebra (inclusive na troca de título)
+    streak = monthly.astype(int).groupby((~monthly).cumsum()).cumsum()
+    reached = streak == min_charges - 1
+    first = reached & (reached.astype(int).groupby(charges['title'], observed=True).cumsum() == 1)
+    # score = cobranças na série; valor esperado = a cobrança anterior
+    return first, (streak + 1).to_numpy(dtype=float), previous.to_numpy()
+
+
+@timed('pandas')
+def detect(df, after_id=0):
+    """
+    Alertas das cobranças com id > after_id, calculados sobre o histórico inteiro do frame
+    (formato de get_transactions_data com id; installment opcional). Retorna FLAG_COLUMNS.
+    """
+    charges = _prepare(df)
+    if charges.empty:
+        return pd.DataFrame(columns=FLAG_COLUMNS)
+    new = charges['id'] > after_id
+
+    parts = []
+    for kind, detector in ((OUTLIER, amount_outliers), (DUPLICATE, duplicate_charges), (NEW_SUBSCRIPTION, new_subscriptions)):
+        mask, score, expected = detector(charges)
+        parts.append(_flags(charges, mask & new, kind, score, expected))
+    return pd.concat(parts, ignore_index=True)
+
+
+def score_new_transactions():
+    """
+    Avalia só as transações importadas desde a última execução (marcador em sync_state) e
+    grava os alertas. Chamado depois de cada importação; sem transações novas não lê nada.
+    Retorna a quantidade de alertas novos.
+    """
+    with _score_lock:
+        watermark = src.models.get_flags_watermark()
+        last_id = src.models.get_last_transaction_id()
+        if last_id <= watermark:
+            return 0
+        started = time.perf_counter()
+        df = src.models.get_scoring_frame(watermark)
+        flags = detect(df[df['id'] <= last_id], watermark)
+        src.models.save_transaction_flags(flags, last_id)
+        print(
+            f"{len(flags)} alerta(s) em {last_id - watermark} transação(ões) nova(s) "
+            f"({len(df)} no histórico avaliado) em {time.perf_counter() - started:.2f}s"
+        )
+        return len(flags)
+
+
+def backfill():
+    """
+    Uma vez por processo, na inicialização do app: avalia as transações gravadas sem passar
+    pela detecção (ex: banco anterior à tabela transaction_flags). Depois disso, quem avalia
+    é a importação; os reruns não leem nem gravam nada aqui.
+    """
+    global _backfilled
+    if _backfilled:
+        return
+    score_new_transactions()
+    _backfilled = True
@@ -0,0 +1,117 @@
+import sys
+import threading
+from collections import OrderedDict
+from functools import wraps
+
+import pandas as pd
+
+
+def _size_of(value):
+    if isinstance(value, pd.DataFrame):
+        return int(value.memory_usage(deep=True).sum())
+    if isinstance(value, pd.Series):
+        return int(value.memory_usage(deep=True))
+    # Figuras Plotly: tamanho do JSON que vai para o navegador
+    if hasattr(value, 'to_plotly_json'):
+        return len(value.to_json())
+    return sys.getsizeof(value)
+
+
+def _copy(value):
+    # Quem chama costuma alterar o DataFrame (ex: editor de categorias); o cache guarda o original intacto
+    if isinstance(value, (pd.DataFrame, pd.Series)):
+        return value.copy()
+    return value
+
+
+class QueryCache:
+    """
+    Cache LRU de leituras, compartilhado entre as sessões do Streamlit.
+    Cada entrada declara as tabelas de que depende; as funções de escrita chamam
+    `bump` com as tabelas alteradas e só as entradas afetadas são descartadas.
+    """
+
+    def __init__(self, max_entries=128, max_bytes=256 * 1024 * 1024):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._lock = threading.RLock()
+        self._versions = {}
+        self._bytes = 0
+        self.data_version = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def version(self, *tables):
+        with self._lock:
+            return tuple(self._versions.get(table, 0) for table in tables)
+
+    def bump(self, *tables):
+        with self._lock:
+            for table in tables:
+                self._versions[table] = self._versions.get(table, 0) + 1
+            self.data_version += 1
+            stale = [key for key, (_, deps, _) in self._entries.items() if deps.intersection(tables)]
+            for key in stale:
+                self._discard(key)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self):
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / total if total else 0.0,
+                'evictions': self.evictions,
+                'entries': len(self._entries),
+                'bytes': self._bytes,
+                'data_version': self.data_version,
+            }
+
+    def _discard(self, key):
+        _, _, size = self._entries.pop(key)
+        self._bytes -= size
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key, value, tables):
+        size = _size_of(value)
+        with self._lock:
+            if key in self._entries:
+                self._discard(key)
+            # Resultado maior que o limite inteiro não é guardado
+            if size > self.max_bytes:
+                return
+            self._entries[key] = (value, frozenset(tables), size)
+            self._bytes += size
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                self._discard(next(iter(self._entries)))
+                self.evictions += 1
+
+    def cached(self, *tables):
+        """Decorator: a chave é (função, parâmetros, versão das tabelas lidas)."""
+        def decorator(func):
+            @wraps(func)
+            def wrapper(*args, **kwargs):
+                key = (func.__qualname__, args, tuple(sorted(kwargs.items())), self.version(*tables))
+                value = self.get(key)
+                if value is None:
+                    value = func(*args, **kwargs)
+                    self.put(key, value, tables)
+                return _copy(value)
+            return wrapper
+        return decorator
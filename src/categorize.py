@@ -0,0 +1,116 @@
+import pandas as pd
+
+# Tipos de regra suportados pelas palavras-chave
+EXACT = 'exact'
+PREFIX = 'prefix'
+CONTAINS = 'contains'
+MATCH_TYPES = (EXACT, PREFIX, CONTAINS)
+
+
+def normalize_keyword(word):
+    return str(word).lower().strip()
+
+
+class KeywordMatcher:
+    """
+    Matcher pré-compilado a partir das palavras-chave.
+    Prioridade: igual ao título > prefixo mais longo > trecho mais longo (Aho-Corasick).
+    """
+
+    def __init__(self, keywords, normalize=None):
+        # `normalize` leva a palavra-chave à mesma forma canônica dos títulos importados
+        normalize = normalize or (lambda words: [normalize_keyword(word) for word in words])
+        keywords = list(keywords)
+        words = normalize([word for word, _, _ in keywords])
+        self._exact = {}
+        self._prefix_trie = {}
+        # Autômato Aho-Corasick: transições, links de falha e melhor saída de cada nó
+        self._goto = [{}]
+        self._fail = [0]
+        self._output = [None]
+
+        for word, (_, category_id, match_type) in zip(words, keywords):
+            word = normalize_keyword(word)
+            if not word:
+                continue
+            if match_type == PREFIX:
+                self._add_prefix(word, category_id)
+            elif match_type == CONTAINS:
+                self._add_contains(word, category_id)
+            else:
+                self._exact[word] = category_id
+        self._build_fail_links()
+
+    def _add_prefix(self, word, category_id):
+        node = self._prefix_trie
+        for char in word:
+            node = node.setdefault(char, {})
+        node[None] = category_id
+
+    def _add_contains(self, word, category_id):
+        node = 0
+        for char in word:
+            nxt = self._goto[node].get(char)
+            if nxt is None:
+                nxt = len(self._goto)
+                self._goto[node][char] = nxt
+                self._goto.append({})
+                self._fail.append(0)
+                self._output.append(None)
+            node = nxt
+        self._output[node] = (len(word), category_id)
+
+    def _build_fail_links(self):
+        queue = list(self._goto[0].values())
+        head = 0
+        while head < len(queue):
+            node = queue[head]
+            head += 1
+            for char, child in self._goto[node].items():
+                fail = self._fail[node]
+                while fail and char not in self._goto[fail]:
+                    fail = self._fail[fail]
+                self._fail[child] = self._goto[fail].get(char, 0)
+                # Sem palavra própria, herda a mais longa alcançável pelo link de falha
+                if self._output[child] is None:
+                    self._output[child] = self._output[self._fail[child]]
+                queue.append(child)
+
+    def _match_prefix(self, title):
+        node = self._prefix_trie
+        found = None
+        for char in title:
+            node = node.get(char)
+            if node is None:
+                break
+            if None in node:
+                found = node[None]
+        return found
+
+    def _match_contains(self, title):
+        node = 0
+        best = None
+        for char in title:
+            while node and char not in self._goto[node]:
+                node = self._fail[node]
+            node = self._goto[node].get(char, 0)
+            out = self._output[node]
+            if out and (best is None or out[0] > best[0]):
+                best = out
+        return best[1] if best else None
+
+    def match(self, title):
+        title = normalize_keyword(title)
+        category_id = self._exact.get(title)
+        if category_id is None and self._prefix_trie:
+            category_id = self._match_prefix(title)
+        if category_id is None and len(self._goto) > 1:
+            category_id = self._match_contains(title)
+        return category_id
+
+    def categorize(self, titles):
+        """Retorna a categoria de cada título (ou <NA>), avaliando cada título distinto uma única vez."""
+        codes, uniques = pd.factorize(titles)
+        matched = pd.array([self.match(title) for title in uniques] + [None], dtype='Int64')
+        # Código -1 (título nulo) aponta para o None adicionado ao final
+        return pd.Series(matched[codes], index=titles.index)
@@ -0,0 +1,219 @@
+import pandas as pd
+
+import src.forecast
+import src.models
+from src.cache import QueryCache
+from src.instrumentation import timed
+
+# Agregados e figuras do dashboard, compartilhados entre as sessões do Streamlit.
+# A chave inclui o período e a versão dos dados: uma importação torna as entradas
+# antigas inalcançáveis e o LRU as descarta.
+FIGURE_CACHE_MAX_ENTRIES = 64
+FIGURE_CACHE_MAX_BYTES = 64 * 1024 * 1024
+figure_cache = QueryCache(FIGURE_CACHE_MAX_ENTRIES, FIGURE_CACHE_MAX_BYTES)
+
+# plotly.express é importado dentro das funções de figura: só carrega quando o Dashboard é aberto
+
+
+def to_reais(df):
+    # Os valores vêm do banco em centavos inteiros; reais só na hora de exibir
+    return df.assign(amount_cents=df["amount_cents"] / 100).rename(columns={"amount_cents": "amount"})
+
+
+def kpi_summary(summary):
+    # Indicadores do topo do Summary/Dashboard, calculados sobre o resumo mês x categoria
+    total = summary["amount_cents"].sum() / 100
+    months = summary["month"].nunique()
+    return {
+        "total": total,
+        "count": int(summary["count"].sum()),
+        "avg_monthly": total / months if months > 0 else 0,
+        "top_category": (
+            summary.groupby("category")["amount_cents"].sum().idxmax()
+            if not summary.empty else "—"
+        ),
+    }
+
+
+@timed('pandas')
+@figure_cache.cached()
+def category_totals(start_dt, end_dt, data_version):
+    summary = src.models.get_monthly_category_totals(start_dt, end_dt)
+    totals = summary.groupby("category")["amount_cents"].sum().reset_index()
+    return to_reais(totals.sort_values("amount_cents", ascending=False))
+
+
+@timed('pandas')
+@figure_cache.cached()
+def monthly_totals(start_dt, end_dt, data_version):
+    summary = src.models.get_monthly_category_totals(start_dt, end_dt)
+    return to_reais(summary.groupby("month")["amount_cents"].sum().reset_index())
+
+
+@timed('pandas')
+@figure_cache.cached()
+def top_expenses(start_dt, end_dt, data_version):
+    top = to_reais(src.models.get_top_merchants(start_dt, end_dt))
+    top["abs_amount"] = top["amount"].abs()
+    return top.sort_values("abs_amount")
+
+
+@timed('plotly')
+@figure_cache.cached()
+def category_pie(start_dt, end_dt, data_version):
+    import plotly.express as px
+
+    fig_pie = px.pie(
+        category_totals(start_dt, end_dt, data_version),
+        values="amount",
+        names="category",
+        title="Expenses by Category",
+        hole=0.35,
+    )
+    fig_pie.update_traces(textposition="inside", textinfo="percent+label")
+    fig_pie.update_layout(showlegend=False, margin=dict(t=40, b=0, l=0, r=0))
+    return fig_pie
+
+
+@timed('plotly')
+@figure_cache.cached()
+def top_expenses_bar(start_dt, end_dt, data_version):
+    import plotly.express as px
+
+    fig_bar = px.bar(
+        top_expenses(start_dt, end_dt, data_version),
+        x="abs_amount",
+        y="title",
+        orientation="h",
+        title="Top 10 Expenses by Title",
+        labels={"abs_amount": "Amount (R$)", "title": ""},
+        text_auto=".2f",
+    )
+    fig_bar.update_layout(margin=dict(t=40, b=0, l=0, r=0))
+    return fig_bar
+
+
+@timed('plotly')
+@figure_cache.cached()
+def monthly_line(start_dt, end_dt, data_version):
+    import plotly.express as px
+
+    fig_line = px.line(
+        monthly_totals(start_dt, end_dt, data_version),
+        x="month",
+        y="amount",
+        title="Monthly Spending Trend",
+        labels={"month": "Month", "amount": "Total (R$)"},
+        markers=True,
+    )
+    fig_line.update_layout(margin=dict(t=40, b=0, l=0, r=0))
+    return fig_line
+
+
+# Previsão e orçamentos: sempre sobre o histórico inteiro, não sobre o período da barra lateral.
+# A chave leva o dia atual (mês projetado e dias restantes) e a versão dos dados.
+@timed('pandas')
+@figure_cache.cached()
+def category_forecast(today, data_version):
+    return src.forecast.forecast(
+        src.models.get_monthly_category_totals(),
+        src.models.get_outstanding_installments(today),
+        src.models.get_installment_payments(),
+        today=today,
+    )
+
+
+@timed('pandas')
+@figure_cache.cached()
+def installment_commitments(today, data_version):
+    # Parcelas por lançar, por mês x categoria, até a última compra em aberto terminar
+    schedule = src.forecast.installment_schedule(
+        src.models.get_outstanding_installments(today), pd.Timestamp(today).to_period("M")
+    )
+    schedule["month"] = schedule["month"].dt.to_timestamp()
+    return schedule.rename(columns={"installments_cents": "amount_cents"})
+
+
+@timed('pandas')
+@figure_cache.cached()
+def open_installments(today, data_version):
+    # Compras parceladas em aberto, com o que falta pagar de cada uma
+    purchases = src.models.get_outstanding_installments(today)
+    remaining = purchases["installment_total"] - purchases["paid"]
+    return pd.DataFrame({
+        "title": purchases["title"],
+        "category": purchases["category"],
+        "purchase_month": purchases["purchase_month"],
+        "installment": purchases["paid"].astype(str) + "/" + purchases["installment_total"].astype(str),
+        "amount": purchases["amount_cents"] / 100,
+        "remaining": purchases["amount_cents"] * remaining / 100,
+    }).sort_values("remaining", ascending=False)
+
+
+@timed('pandas')
+@figure_cache.cached()
+def forecast_table(today, data_version):
+    # Categorias x meses projetados, em reais
+    projected = category_forecast(today, data_version)
+    table = projected.pivot_table(index="category", columns="month", values="forecast_cents", aggfunc="sum")
+    table.columns = [month.strftime("%m/%Y") for month in table.columns]
+    return (table / 100).reset_index()
+
+
+@timed('pandas')
+@figure_cache.cached()
+def budget_alerts(today, data_version):
+    return src.forecast.budget_status(
+        category_forecast(today, data_version),
+        src.models.get_monthly_category_totals(),
+        src.models.get_budgets(),
+        today,
+    )
+
+
+@timed('plotly')
+@figure_cache.cached()
+def forecast_line(today, data_version):
+    import plotly.express as px
+
+    actual = monthly_totals(None, None, data_version).assign(series="Actual")
+    projected = category_forecast(today, data_version).groupby("month", as_index=False)["forecast_cents"].sum()
+    projected = projected.rename(columns={"forecast_cents": "amount"}).assign(
+        amount=lambda df: df["amount"] / 100, series="Forecast"
+    )
+    fig_line = px.line(
+        pd.concat([actual, projected], ignore_index=True),
+        x="month",
+        y="amount",
+        color="series",
+        title="Monthly Spending and Forecast",
+        labels={"month": "Month", "amount": "Total (R$)", "series": ""},
+        markers=True,
+    )
+    fig_line.update_layout(margin=dict(t=40, b=0, l=0, r=0))
+    return fig_line
+
+
+@timed('plotly')
+@figure_cache.cached()
+def installments_bar(today, data_version):
+    import plotly.express as px
+
+    fig_bar = px.bar(
+        to_reais(installment_commitments(today, data_version)),
+        x="month",
+        y="amount",
+        color="category",
+        title="Outstanding Installments per Month",
+        labels={"month": "Month", "amount": "Amount (R$)", "category": "Category"},
+    )
+    fig_bar.update_layout(margin=dict(t=40, b=0, l=0, r=0))
+    return fig_bar
+
+
+@timed('pandas')
+@figure_cache.cached()
+def unusual_charges(start_dt, end_dt, data_version):
+    # Alertas de src.anomalies no período, com valores e referência em reais
+    flags = src.models.get_transaction_flags(start_dt, end_dt)
+    return to_reais(flags).assign(expected=flags["expected_cents"] / 100).drop(columns="expected_cents")
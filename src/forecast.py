@@ -0,0 +1,198 @@
+import numpy as np
+import pandas as pd
+
+# Meses de histórico na média móvel que define o nível de cada categoria
+FORECAST_WINDOW = 3
+# Meses projetados, contando o mês atual
+FORECAST_HORIZON = 6
+# Sazonalidade só é estimada com pelo menos dois anos de histórico
+SEASON = 12
+SEASONAL_MIN_MONTHS = 2 * SEASON
+# Pesos da média móvel centrada 2x12 (tendência usada na decomposição sazonal)
+TREND_WEIGHTS = np.r_[0.5, np.ones(SEASON - 1), 0.5] / SEASON
+
+FORECAST_COLUMNS = ['month', 'category', 'baseline_cents', 'installments_cents', 'forecast_cents']
+BUDGET_STATUSES = ['over', 'at_risk', 'warning', 'ok']
+
+
+def empty_forecast():
+    # Sem histórico nem parcelas: mesmas colunas e tipos da projeção (month datetime64 para os merges)
+    return pd.DataFrame({
+        'month': pd.Series([], dtype='datetime64[ns]'),
+        'category': pd.Series([], dtype=object),
+        **{column: pd.Series([], dtype='int64') for column in FORECAST_COLUMNS[2:]},
+    })
+
+
+def monthly_matrix(summary, end_month):
+    """
+    Resumo mês x categoria (colunas month, category, amount_cents) como matriz
+    meses x categorias em centavos, com os meses sem gasto zerados.
+    Só entram os meses anteriores a `end_month` (um pd.Period mensal).
+    """
+    history = summary.assign(month=summary['month'].dt.to_period('M'))
+    history = history[history['month'] < end_month]
+    if history.empty:
+        return pd.DataFrame(index=pd.PeriodIndex([], freq='M'), dtype='int64')
+    matrix = history.pivot_table(
+        index='month', columns='category', values='amount_cents', aggfunc='sum', fill_value=0, observed=True
+    )
+    return matrix.reindex(pd.period_range(matrix.index.min(), end_month - 1, freq='M'), fill_value=0)
+
+
+def seasonal_indices(matrix):
+    """
+    Índice sazonal multiplicativo (12 x categorias) pelo método da razão à média móvel:
+    cada mês dividido pela tendência (média móvel centrada 2x12), média das razões por
+    mês do ano, normalizada para média 1. Categorias com menos de SEASONAL_MIN_MONTHS
+    meses de histórico ficam com índice 1 (sem sazonalidade).
+    """
+    values = matrix.to_numpy(dtype=float)
+    indices = np.ones((SEASON, values.shape[1]))
+    if len(values) < SEASONAL_MIN_MONTHS:
+        return indices
+
+    # Tendência de todas as categorias de uma vez: janelas (meses-12, categorias, 13) x pesos
+    half = SEASON // 2
+    trend = np.lib.stride_tricks.sliding_window_view(values, len(TREND_WEIGHTS), axis=0) @ TREND_WEIGHTS
+    centered = values[half:len(values) - half]
+    ratios = np.divide(centered, trend, out=np.full_like(centered, np.nan), where=trend > 0)
+
+    # Média por mês do ano via matriz indicadora (12 x meses) em vez de laço por categoria
+    month_of_year = matrix.index.month.to_numpy()[half:len(values) - half] - 1
+    indicator = np.eye(SEASON)[month_of_year].T
+    valid = ~np.isnan(ratios)
+    counts = indicator @ valid
+    means = np.divide(indicator @ np.where(valid, ratios, 0), counts, out=np.ones_like(indices), where=counts > 0)
+    means = means / means.mean(axis=0)
+
+    # Meses desde o primeiro gasto de cada categoria
+    first_spent = np.argmax(values != 0, axis=0)
+    seasonal = (len(values) - first_spent >= SEASONAL_MIN_MONTHS) & np.isfinite(means).all(axis=0)
+    indices[:, seasonal] = means[:, seasonal]
+    return indices
+
+
+def installment_schedule(purchases, start_month, horizon=None):
+    """
+    Parcelas ainda não lançadas, somadas por mês x categoria, a partir de `start_month`
+    (e nos `horizon` meses seguintes, quando informado). `purchases` vem de
+    get_outstanding_installments: uma linha por compra, com category, amount_cents,
+    installment_total, purchase_month e paid (última parcela lançada).
+    """
+    columns = ['month', 'category', 'installments_cents', 'count']
+    if purchases is None or purchases.empty:
+        return pd.DataFrame({
+            'month': pd.PeriodIndex([], freq='M'),
+            'category': pd.Series([], dtype=object),
+            'installments_cents': pd.Series([], dtype='int64'),
+            'count': pd.Series([], dtype='int64'),
+        })
+    remaining = (purchases['installment_total'] - purchases['paid']).clip(lower=0).to_numpy(dtype='int64')
+
+    # Uma linha por parcela futura: repete cada compra `remaining` vezes e numera paid+1..total
+    rows = np.repeat(np.arange(len(purchases)), remaining)
+    offsets = np.arange(remaining.sum()) - np.repeat(np.cumsum(remaining) - remaining, remaining)
+    numbers = purchases['paid'].to_numpy(dtype='int64')[rows] + offsets + 1
+    months = purchases['purchase_month'].dt.to_period('M').astype('int64').to_numpy()[rows] + numbers - 1
+    future = pd.DataFrame({
+        'month': months,
+        'category': purchases['category'].to_numpy()[rows],
+        'installments_cents': purchases['amount_cents'].to_numpy(dtype='int64')[rows],
+    })
+    start = start_month.ordinal
+    in_range = future['month'] >= start
+    if horizon is not None:
+        in_range &= future['month'] < start + horizon
+    future = (
+        future[in_range]
+        .groupby(['month', 'category'], as_index=False, observed=True)
+        .agg(installments_cents=('installments_cents', 'sum'), count=('installments_cents', 'size'))
+    )
+    future['month'] = pd.PeriodIndex.from_ordinals(future['month'], freq='M')
+    return future[columns]
+
+
+def installment_history(payments, matrix):
+    # Parcelas já lançadas (get_installment_payments) na forma da matriz de histórico, para tirar do nível
+    if payments is None or payments.empty:
+        return pd.DataFrame(0, index=matrix.index, columns=matrix.columns)
+    paid = payments.assign(month=payments['date'].dt.to_period('M')).pivot_table(
+        index='month', columns='category', values='amount_cents', aggfunc='sum', fill_value=0, observed=True
+    )
+    return paid.reindex(index=matrix.index, columns=matrix.columns, fill_value=0)
+
+
+def forecast(summary, purchases=None, payments=None, today=None, horizon=FORECAST_HORIZON, window=FORECAST_WINDOW):
+    """
+    Projeção por categoria para o mês atual e os seguintes, todas as categorias numa passada:
+    nível = média móvel dos últimos `window` meses fechados (sem sazonalidade e sem parcelas),
+    vezes o índice sazonal do mês projetado, mais as parcelas que ainda vão cair no mês.
+    `summary` é o resumo de get_monthly_category_totals sobre todo o histórico; `purchases`
+    e `payments` são as compras parceladas em aberto e as parcelas já lançadas.
+    """
+    current = pd.Timestamp(today or pd.Timestamp.today()).to_period('M')
+    months = pd.period_range(current, periods=horizon, freq='M')
+    matrix = monthly_matrix(summary, current)
+    scheduled = installment_schedule(purchases, current, horizon).drop(columns='count')
+    if matrix.empty and scheduled.empty:
+        return empty_forecast()
+
+    # Parcelas lançadas saem do histórico: o futuro delas vem do cronograma, não da média
+    values = (matrix - installment_history(payments, matrix)).to_numpy(dtype=float)
+    indices = seasonal_indices(matrix)
+    recent = values[-window:]
+    recent_indices = indices[matrix.index.month.to_numpy()[-window:] - 1]
+    deseasonalized = np.divide(recent, recent_indices, out=recent.copy(), where=recent_indices > 0)
+    level = deseasonalized.mean(axis=0) if len(recent) else np.zeros(values.shape[1])
+    baseline = np.maximum(level * indices[months.month.to_numpy() - 1], 0)
+
+    projected = pd.DataFrame(
+        np.rint(baseline).astype('int64'), index=pd.Index(months, name='month'), columns=matrix.columns
+    ).rename_axis(columns='category').stack().rename('baseline_cents').reset_index()
+    projected = projected.merge(scheduled, on=['month', 'category'], how='outer')
+    projected = projected.fillna({'baseline_cents': 0, 'installments_cents': 0}).astype(
+        {'baseline_cents': 'int64', 'installments_cents': 'int64'}
+    )
+    projected['forecast_cents'] = projected['baseline_cents'] + projected['installments_cents']
+    projected['month'] = projected['month'].dt.to_timestamp()
+    return projected[FORECAST_COLUMNS].sort_values(['month', 'category'], ignore_index=True)
+
+
+def budget_status(projected, summary, budgets, today=None):
+    """
+    Situação de cada orçamento nos meses projetados. No mês atual o projetado é o já gasto
+    mais a previsão proporcional aos dias que faltam; nos seguintes, a própria previsão.
+    Status: 'over' (gasto passou do limite), 'at_risk' (projeção passa do limite),
+    'warning' (projeção passa de alert_ratio do limite) ou 'ok'.
+    """
+    today = pd.Timestamp(today or pd.Timestamp.today()).normalize()
+    current = today.to_period('M').to_timestamp()
+    spent = (
+        summary[summary['month'].dt.to_period('M').dt.to_timestamp() == current]
+        .groupby('category', as_index=False, observed=True)['amount_cents'].sum()
+        .rename(columns={'amount_cents': 'spent_cents'})
+        .assign(month=current)
+    )
+    status = (
+        budgets.merge(projected[['month', 'category', 'forecast_cents']], on='category', how='left')
+        .merge(spent, on=['month', 'category'], how='left')
+        .fillna({'month': current, 'forecast_cents': 0, 'spent_cents': 0})
+    )
+    status = status.astype({'forecast_cents': 'int64', 'spent_cents': 'int64'})
+
+    # Fração do mês atual que ainda falta; os meses seguintes contam inteiros
+    elapsed = (today.day - 1) / today.days_in_month
+    remaining = np.where(status['month'] == current, 1 - elapsed, 1.0)
+    status['projected_cents'] = np.rint(status['spent_cents'] + status['forecast_cents'] * remaining).astype('int64')
+    status['usage'] = status['projected_cents'] / status['limit_cents']
+    status['status'] = np.select(
+        [
+            status['spent_cents'] >= status['limit_cents'],
+            status['projected_cents'] >= status['limit_cents'],
+            status['usage'] >= status['alert_ratio'],
+        ],
+        BUDGET_STATUSES[:3],
+        default='ok',
+    )
+    return status.sort_values(['month', 'usage'], ascending=[True, False], ignore_index=True)
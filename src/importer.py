@@ -0,0 +1,108 @@
+import argparse
+import glob
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import src.anomalies
+import src.models
+from src.instrumentation import timed
+from src.normalize import TitleNormalizer, title_normalize
+from src.utils import iter_transactions, file_sha256, LOAD_CHUNK_SIZE
+
+
+def iter_normalized_chunks(file, chunksize=LOAD_CHUNK_SIZE, normalizer=None):
+    for chunk in iter_transactions(file, chunksize):
+        yield title_normalize(chunk, normalizer)
+
+
+@timed('import')
+def import_file(file, chunksize=LOAD_CHUNK_SIZE):
+    """
+    Importa um CSV em streaming: leitura, normalização, categorização e gravação
+    acontecem lote a lote, então o pico de memória é limitado pelo chunksize.
+    Retorna a quantidade de transações novas.
+    """
+    chunks = iter_normalized_chunks(file, chunksize, src.models.import_normalizer)
+    inserted = src.models.save_transaction_chunks(chunks)
+    # Alertas só das transações novas (src.anomalies guarda até onde já avaliou)
+    if inserted:
+        src.anomalies.score_new_transactions()
+    return inserted
+
+
+# Normalizador de cada processo do pool, semeado com as formas canônicas já gravadas
+_worker_normalizer = None
+
+
+def init_worker(canonical):
+    global _worker_normalizer
+    _worker_normalizer = TitleNormalizer()
+    _worker_normalizer.remember(canonical)
+
+
+def parse_file(path, chunksize=LOAD_CHUNK_SIZE):
+    """
+    Roda num processo do pool: leitura e normalização sem tocar no banco. As formas já gravadas vêm
+    do memo semeado em init_worker e as novas saem das mesmas regras, então o resultado vale como está.
+    """
+    started = time.perf_counter()
+    chunks = list(iter_normalized_chunks(path, chunksize, _worker_normalizer))
+    return chunks, time.perf_counter() - started
+
+
+@timed('import')
+def import_directory(path='./data', max_workers=None, chunksize=LOAD_CHUNK_SIZE):
+    """
+    Importa todos os CSVs de um diretório. Arquivos já importados (mesmo SHA-256) são ignorados;
+    os demais são lidos e normalizados em paralelo num pool de processos (semeado uma vez com
+    canonical_titles), e o resultado é gravado por um único escritor (este processo), arquivo por
+    arquivo; as formas canônicas novas são gravadas junto com as transações.
+    Retorna uma lista com (arquivo, linhas lidas, linhas novas, segundos de leitura, segundos de gravação).
+    """
+    started = time.perf_counter()
+    files = sorted(glob.glob(os.path.join(path, '*.csv')))
+    checksums = {file_sha256(file): file for file in files}
+    imported = src.models.get_imported_checksums(checksums)
+    pending = {sha256: file for sha256, file in checksums.items() if sha256 not in imported}
+    print(f"{len(files)} arquivo(s) em {path}: {len(pending)} novo(s), {len(files) - len(pending)} já importado(s)")
+
+    report = []
+    canonical = src.models.get_canonical_titles() if pending else {}
+    with ProcessPoolExecutor(max_workers=max_workers, initializer=init_worker, initargs=(canonical,)) as executor:
+        futures = {executor.submit(parse_file, file, chunksize): sha256 for sha256, file in pending.items()}
+        for future in as_completed(futures):
+            sha256 = futures[future]
+            file = pending[sha256]
+            name = os.path.basename(file)
+            try:
+                chunks, parse_seconds = future.result()
+            except Exception as e:
+                print(f"{name}: erro ao ler o arquivo ({e})")
+                continue
+
+            write_started = time.perf_counter()
+            rows = sum(len(chunk) for chunk in chunks)
+            inserted = src.models.save_transaction_chunks(chunks)
+            src.models.save_imported_file(sha256, name, rows)
+            write_seconds = time.perf_counter() - write_started
+
+            print(f"{name}: {rows} linha(s), {inserted} nova(s), leitura {parse_seconds:.2f}s, gravação {write_seconds:.2f}s")
+            report.append((name, rows, inserted, parse_seconds, write_seconds))
+
+    # Uma avaliação de alertas para o diretório inteiro, depois de todos os arquivos
+    if any(item[2] for item in report):
+        src.anomalies.score_new_transactions()
+
+    total_rows = sum(item[1] for item in report)
+    print(f"Total: {total_rows} linha(s) de {len(report)} arquivo(s) em {time.perf_counter() - started:.2f}s")
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Importa em massa os extratos CSV de um diretório.")
+    parser.add_argument("path", nargs="?", default="./data")
+    parser.add_argument("--workers", type=int, default=None, help="processos de leitura (padrão: núcleos da máquina)")
+    parser.add_argument("--chunksize", type=int, default=LOAD_CHUNK_SIZE)
+    args = parser.parse_args()
+    import_directory(args.path, args.workers, args.chunksize)
@@ -0,0 +1,199 @@
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime
+from functools import wraps
+
+import pandas as pd
+from dotenv import load_dotenv
+from sqlalchemy import event
+
+load_dotenv()
+
+# Desliga a instrumentação inteira (decorators viram no-op e o hook SQL não é instalado)
+PERF_INSTRUMENTATION = os.getenv('PERF_INSTRUMENTATION', '1') not in ('0', 'false', 'False', '')
+# Limite de spans guardados por rerun (uma importação grande gera milhares de statements)
+MAX_SPANS_PER_RUN = 2000
+# Statements SQL distintos acompanhados no processo
+MAX_STATEMENTS = 500
+
+_current_run = ContextVar('current_run', default=None)
+_depth = ContextVar('span_depth', default=0)
+
+
+def _rows(value):
+    if isinstance(value, (pd.DataFrame, pd.Series, list, tuple, set, dict)):
+        return len(value)
+    return None
+
+
+class Run:
+    """Spans de uma execução (um rerun do Streamlit, uma importação) na ordem em que terminaram."""
+
+    def __init__(self, name):
+        self.name = name
+        self.started_at = datetime.now().isoformat(timespec='seconds')
+        self.duration_ms = None
+        self.spans = []
+        self.dropped = 0
+        self._started = time.perf_counter()
+
+    def add(self, span):
+        if len(self.spans) < MAX_SPANS_PER_RUN:
+            self.spans.append(span)
+        else:
+            self.dropped += 1
+
+    def finish(self):
+        self.duration_ms = (time.perf_counter() - self._started) * 1000
+
+    def frame(self):
+        return pd.DataFrame(self.spans, columns=['name', 'kind', 'depth', 'start_ms', 'duration_ms', 'rows'])
+
+    def breakdown(self):
+        # Tempo inclusivo por tipo: render contém query, que contém sql
+        spans = self.frame()
+        return (
+            spans.groupby('kind', as_index=False)
+            .agg(duration_ms=('duration_ms', 'sum'), count=('name', 'size'))
+            .sort_values('duration_ms', ascending=False)
+        )
+
+    def to_dict(self):
+        return {
+            'name': self.name,
+            'started_at': self.started_at,
+            'duration_ms': self.duration_ms,
+            'dropped_spans': self.dropped,
+            'spans': self.spans,
+        }
+
+
+class Recorder:
+    """
+    Instrumentação dos caminhos quentes: `timed`/`span` medem funções e trechos dentro
+    da execução atual, e o hook do SQLAlchemy mede cada statement, acumulando a
+    latência por texto de SQL no processo inteiro.
+    """
+
+    def __init__(self, enabled=PERF_INSTRUMENTATION, max_statements=MAX_STATEMENTS):
+        self.enabled = enabled
+        self.max_statements = max_statements
+        self._statements = OrderedDict()
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def run(self, name):
+        run = Run(name)
+        token = _current_run.set(run)
+        try:
+            yield run
+        finally:
+            run.finish()
+            _current_run.reset(token)
+
+    def _add(self, name, kind, depth, started, duration_ms, rows):
+        run = _current_run.get()
+        if run is not None:
+            run.add({
+                'name': name,
+                'kind': kind,
+                'depth': depth,
+                'start_ms': round((started - run._started) * 1000, 3),
+                'duration_ms': round(duration_ms, 3),
+                'rows': rows,
+            })
+
+    @contextmanager
+    def span(self, name, kind='function'):
+        # `info['rows']` pode ser preenchido dentro do bloco
+        info = {'rows': None}
+        if not self.enabled:
+            yield info
+            return
+        depth = _depth.get()
+        token = _depth.set(depth + 1)
+        started = time.perf_counter()
+        try:
+            yield info
+        finally:
+            _depth.reset(token)
+            self._add(name, kind, depth, started, (time.perf_counter() - started) * 1000, info['rows'])
+
+    def timed(self, kind='function', name=None):
+        """Decorator: mede a função e, quando ela devolve DataFrame/lista, quantas linhas."""
+        def decorator(func):
+            if not self.enabled:
+                return func
+            label = name or f"{func.__module__}.{func.__qualname__}"
+
+            @wraps(func)
+            def wrapper(*args, **kwargs):
+                with self.span(label, kind) as info:
+                    value = func(*args, **kwargs)
+                    info['rows'] = _rows(value)
+                return value
+            return wrapper
+        return decorator
+
+    def record_statement(self, statement, duration_ms, rows, started):
+        self._add(' '.join(statement.split())[:120], 'sql', _depth.get(), started, duration_ms, rows)
+        with self._lock:
+            stats = self._statements.pop(statement, None) or {'count': 0, 'total_ms': 0.0, 'max_ms': 0.0, 'rows': 0}
+            stats['count'] += 1
+            stats['total_ms'] += duration_ms
+            stats['max_ms'] = max(stats['max_ms'], duration_ms)
+            stats['rows'] += max(rows or 0, 0)
+            self._statements[statement] = stats
+            while len(self._statements) > self.max_statements:
+                self._statements.popitem(last=False)
+
+    def slowest(self, limit=20):
+        with self._lock:
+            rows = [{'statement': statement, **stats} for statement, stats in self._statements.items()]
+        df = pd.DataFrame(rows, columns=['statement', 'count', 'total_ms', 'max_ms', 'rows'])
+        df['avg_ms'] = df['total_ms'] / df['count']
+        return df.sort_values('total_ms', ascending=False).head(limit).reset_index(drop=True)
+
+    def reset(self):
+        with self._lock:
+            self._statements.clear()
+
+    def install(self, engine):
+        """Registra os eventos do SQLAlchemy que medem cada statement executado no engine."""
+        if not self.enabled:
+            return
+
+        @event.listens_for(engine, 'before_cursor_execute')
+        def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+            conn.info.setdefault('query_started', []).append(time.perf_counter())
+
+        @event.listens_for(engine, 'after_cursor_execute')
+        def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+            started = conn.info['query_started'].pop()
+            # rowcount é -1 para SELECT no sqlite3; em executemany é o total de linhas afetadas
+            rows = cursor.rowcount if cursor.rowcount >= 0 else None
+            self.record_statement(statement, (time.perf_counter() - started) * 1000, rows, started)
+
+        @event.listens_for(engine, 'handle_error')
+        def handle_error(context):
+            # Statement com erro não passa pelo after_cursor_execute
+            started = context.connection.info.get('query_started') if context.connection is not None else None
+            if started:
+                started.pop()
+
+    def export_json(self, run=None, limit=50):
+        return json.dumps({
+            'exported_at': datetime.now().isoformat(timespec='seconds'),
+            'run': run.to_dict() if run is not None else None,
+            'slowest_statements': self.slowest(limit).to_dict('records'),
+        }, indent=2, ensure_ascii=False, default=str)
+
+
+recorder = Recorder()
+timed = recorder.timed
+span = recorder.span
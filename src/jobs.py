@@ -0,0 +1,114 @@
+import queue
+import threading
+import time
+from datetime import datetime
+
+import src.models
+
+# Intervalo mínimo (s) entre gravações de progresso, para não disputar o banco com o dashboard
+JOB_PROGRESS_INTERVAL = 1.0
+
+
+class JobRunner:
+    """
+    Executa jobs numa thread de fundo, um por vez, fora do script do Streamlit.
+    O estado de cada job (fila, progresso, resultado) fica na tabela sync_jobs, então
+    qualquer sessão consegue acompanhar; o índice único parcial impede dois jobs do
+    mesmo tipo em andamento, mesmo com cliques repetidos ou vários processos.
+    """
+
+    def __init__(self, progress_interval=JOB_PROGRESS_INTERVAL):
+        self.progress_interval = progress_interval
+        self._handlers = {}
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._worker = None
+        self._schedules = {}
+
+    def register(self, kind, handler):
+        """`handler(progress)` executa o job; `progress(fraction, message=None)` informa o avanço."""
+        self._handlers[kind] = handler
+
+    def submit(self, kind, trigger='manual'):
+        """Enfileira o job se não houver outro do mesmo tipo em andamento. Retorna (id, criado)."""
+        if kind not in self._handlers:
+            raise ValueError(f"Tipo de job não registrado: {kind}")
+        job_id, created = src.models.create_job(kind, trigger)
+        if created:
+            self._ensure_worker()
+            self._queue.put(job_id)
+        return job_id, created
+
+    def _ensure_worker(self):
+        with self._lock:
+            if self._worker is None or not self._worker.is_alive():
+                self._worker = threading.Thread(target=self._work, name='job-runner', daemon=True)
+                self._worker.start()
+
+    def _work(self):
+        while True:
+            self.run_job(self._queue.get())
+
+    def run_job(self, job_id):
+        job = src.models.get_job(job_id)
+        handler = self._handlers[job['kind']]
+        src.models.update_job(
+            job_id, status=src.models.JOB_RUNNING, started_at=datetime.now(), message='Iniciando...'
+        )
+        last_update = 0.0
+
+        def progress(fraction, message=None):
+            nonlocal last_update
+            now = time.monotonic()
+            if now - last_update < self.progress_interval:
+                return
+            last_update = now
+            values = {'progress': min(max(float(fraction), 0.0), 1.0)}
+            if message is not None:
+                values['message'] = message
+            src.models.update_job(job_id, **values)
+
+        try:
+            result = handler(progress)
+        except Exception as e:
+            src.models.update_job(
+                job_id, status=src.models.JOB_FAILED, error=str(e), finished_at=datetime.now()
+            )
+        else:
+            src.models.update_job(
+                job_id, status=src.models.JOB_SUCCEEDED, progress=1.0, message=None,
+                result=None if result is None else str(result), finished_at=datetime.now(),
+            )
+        finally:
+            # A thread do runner tem a própria sessão (scoped_session)
+            src.models.close_session()
+
+    def schedule(self, kind, interval_seconds):
+        """
+        Sincronização periódica: enfileira `kind` quando o último job do tipo tiver sido
+        criado há mais de `interval_seconds`. Chamar de novo para o mesmo tipo não cria
+        outra thread (o script do Streamlit roda a cada rerun).
+        """
+        with self._lock:
+            if kind in self._schedules:
+                self._schedules[kind] = interval_seconds
+                return
+            self._schedules[kind] = interval_seconds
+        threading.Thread(target=self._schedule_loop, args=(kind,), name=f'job-schedule-{kind}', daemon=True).start()
+
+    def _schedule_loop(self, kind):
+        while True:
+            interval = self._schedules[kind]
+            try:
+                latest = src.models.get_latest_job(kind)
+                if latest is None or (datetime.now() - latest['created_at']).total_seconds() >= interval:
+                    self.submit(kind, trigger='schedule')
+            except Exception as e:
+                # Falha pontual (ex: banco bloqueado) não derruba o agendamento
+                print(f"Erro ao agendar {kind}: {e}")
+            finally:
+                src.models.close_session()
+            time.sleep(min(interval, 60))
+
+
+runner = JobRunner()
@@ -1,6 +1,19 @@
-from sqlalchemy import update, create_engine, Column, Integer, String, Float, Date, ForeignKey, select
-from sqlalchemy.orm import declarative_base, relationship, sessionmaker
+from sqlalchemy import update, insert, delete, bindparam, false, func, event, text, create_engine, Column, Index, UniqueConstraint, Integer, BigInteger, Float, String, Date, DateTime, ForeignKey, select
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import declarative_base, relationship, sessionmaker, scoped_session
+from dotenv import load_dotenv
+from src.cache import QueryCache
+from src.categorize import KeywordMatcher, EXACT, PREFIX, CONTAINS, normalize_keyword
+from src.normalize import TitleNormalizer
+from src.instrumentation import recorder, span, timed
 import pandas as pd
+import glob
+import hashlib
+import os
+import re
+import threading
+from datetime import date, datetime, timedelta
 
 Base = declarative_base()
 class Category(Base):
@@ -10,22 +23,76 @@ class Category(Base):
 
     transactions = relationship('Transaction', back_populates='category')
     keywords = relationship('Keyword', back_populates='category', cascade="all, delete-orphan")
+    budget = relationship('Budget', back_populates='category', cascade="all, delete-orphan", uselist=False)
+
+class Merchant(Base):
+    # Títulos (já normalizados) internados: cada transação guarda só o id inteiro
+    __tablename__ = 'merchants'
+    id = Column(Integer, primary_key=True)
+    name = Column(String, unique=True, nullable=False)
+
+    transactions = relationship('Transaction', back_populates='merchant')
+
+_PARCEL_WHERE = text('purchase_id IS NOT NULL')
 
 class Transaction(Base):
     __tablename__ = 'transactions'
     id = Column(Integer, primary_key=True)
-    date = Column(Date, nullable=False)
-    title = Column(String, nullable=False)
-    amount = Column(Float, nullable=False)
+    date = Column(Date, nullable=False, index=True)
+    merchant_id = Column(Integer, ForeignKey('merchants.id'), nullable=False, index=True)
+    # Valor em centavos (ponto fixo): somas exatas, sem o arredondamento de float
+    amount_cents = Column(BigInteger, nullable=False)
     category_id = Column(Integer, ForeignKey('categories.id'))
+    # Hash do conteúdo da linha importada, usado para ignorar reimportações
+    import_hash = Column(String(40), unique=True, index=True)
+    # Parcela "N/M" do título original (vazio em compras à vista) e a compra parcelada a que pertence
+    installment_number = Column(Integer)
+    installment_total = Column(Integer)
+    purchase_id = Column(Integer, ForeignKey('installment_purchases.id'))
 
     category = relationship('Category', back_populates='transactions')
+    merchant = relationship('Merchant', back_populates='transactions')
+    purchase = relationship('InstallmentPurchase', back_populates='installments')
+
+    # Parcelas de uma compra em ordem: liga a série e dá a última parcela lançada sem ler a tabela.
+    # Índice parcial: compras à vista (a maioria) não entram nele nem pagam a manutenção na importação
+    __table_args__ = (
+        Index(
+            'ix_transactions_purchase_installment', 'purchase_id', 'installment_number',
+            sqlite_where=_PARCEL_WHERE, postgresql_where=_PARCEL_WHERE,
+        ),
+    )
+
+class InstallmentPurchase(Base):
+    # Compra parcelada original; cada parcela lançada aponta para ela por transactions.purchase_id
+    __tablename__ = 'installment_purchases'
+    id = Column(Integer, primary_key=True)
+    merchant_id = Column(Integer, ForeignKey('merchants.id'), nullable=False)
+    # Valor de cada parcela, em centavos
+    amount_cents = Column(BigInteger, nullable=False)
+    installment_total = Column(Integer, nullable=False)
+    # Mês da primeira e da última parcela; compromissos em aberto saem do índice em final_month
+    purchase_month = Column(Date, nullable=False)
+    final_month = Column(Date, nullable=False, index=True)
+
+    installments = relationship('Transaction', back_populates='purchase')
+
+    # Uma série é a mesma compra em todos os extratos: estabelecimento, valor, parcelas e mês da compra
+    # (valores a um centavo de distância são ligados à série já gravada, ver _near_series)
+    __table_args__ = (
+        UniqueConstraint(
+            'merchant_id', 'amount_cents', 'installment_total', 'purchase_month',
+            name='uq_installment_purchases_series',
+        ),
+    )
 
 class Keyword(Base):
     __tablename__ = 'keywords'
     id = Column(Integer, primary_key=True)
     word = Column(String, unique=True, nullable=False)
     category_id = Column(Integer, ForeignKey('categories.id'))
+    # 'exact' (título igual), 'prefix' (título começa com) ou 'contains' (título contém)
+    match_type = Column(String, nullable=False, default=EXACT, server_default=EXACT)
 
     category = relationship('Category', back_populates='keywords')
 
@@ -34,31 +101,262 @@ class Keyword(Base):
             "id": self.id,
             "word": self.word,
             "category_id": self.category_id,
+            "match_type": self.match_type,
         }
 
+class MonthlyCategoryTotal(Base):
+    # Resumo mês x categoria mantido incrementalmente pelas funções de escrita
+    __tablename__ = 'monthly_category_totals'
+    month = Column(Date, primary_key=True)
+    category_id = Column(Integer, ForeignKey('categories.id'), primary_key=True)
+    total_cents = Column(BigInteger, nullable=False, default=0)
+    count = Column(Integer, nullable=False, default=0)
+
+class Budget(Base):
+    # Limite mensal de gasto por categoria; o alerta dispara ao atingir alert_ratio do limite
+    __tablename__ = 'budgets'
+    category_id = Column(Integer, ForeignKey('categories.id'), primary_key=True)
+    limit_cents = Column(BigInteger, nullable=False)
+    alert_ratio = Column(Float, nullable=False, default=0.8, server_default='0.8')
+
+    category = relationship('Category', back_populates='budget')
+
+class GmailMessage(Base):
+    # Mensagens do Gmail já processadas pela sincronização de faturas
+    __tablename__ = 'gmail_messages'
+    id = Column(String, primary_key=True)
+    history_id = Column(String)
+    processed_at = Column(DateTime, nullable=False, default=datetime.now)
+
+class SyncState(Base):
+    # Marcadores de sincronização (ex: último historyId do Gmail)
+    __tablename__ = 'sync_state'
+    key = Column(String, primary_key=True)
+    value = Column(String)
+
+class UploadedFile(Base):
+    # Arquivos já enviados ao Google Drive, identificados pelo SHA-256 do conteúdo
+    __tablename__ = 'uploaded_files'
+    id = Column(Integer, primary_key=True)
+    sha256 = Column(String(64), unique=True, nullable=False)
+    name = Column(String, nullable=False, index=True)
+    drive_file_id = Column(String)
+    size = Column(Integer)
+    uploaded_at = Column(DateTime, nullable=False, default=datetime.now)
+
+class ImportedFile(Base):
+    # Extratos já importados, identificados pelo SHA-256 do conteúdo
+    __tablename__ = 'imported_files'
+    id = Column(Integer, primary_key=True)
+    sha256 = Column(String(64), unique=True, nullable=False)
+    name = Column(String, nullable=False)
+    rows = Column(Integer, nullable=False, default=0)
+    imported_at = Column(DateTime, nullable=False, default=datetime.now)
+
+class CanonicalTitle(Base):
+    # Forma canônica de cada título original, compartilhada entre importação e palavras-chave
+    __tablename__ = 'canonical_titles'
+    raw_title = Column(String, primary_key=True)
+    title = Column(String, nullable=False)
+
+class TransactionFlag(Base):
+    # Cobranças fora do padrão marcadas por src.anomalies; uma linha por transação e tipo de alerta
+    __tablename__ = 'transaction_flags'
+    transaction_id = Column(Integer, ForeignKey('transactions.id'), primary_key=True)
+    # 'amount_outlier', 'duplicate' ou 'new_subscription'
+    kind = Column(String, primary_key=True)
+    # Quanto a cobrança se afasta do esperado (ex: valor / média do estabelecimento)
+    score = Column(Float, nullable=False)
+    # Valor de referência: média recente, cobrança anterior igual ou valor típico da assinatura
+    expected_cents = Column(BigInteger)
+    flagged_at = Column(DateTime, nullable=False, default=datetime.now)
+
+# Estados de um job em segundo plano; queued e running contam como "em andamento"
+JOB_QUEUED = 'queued'
+JOB_RUNNING = 'running'
+JOB_SUCCEEDED = 'succeeded'
+JOB_FAILED = 'failed'
+ACTIVE_JOB_STATUSES = (JOB_QUEUED, JOB_RUNNING)
+_ACTIVE_JOB_WHERE = text("status IN ('queued', 'running')")
+
+class SyncJob(Base):
+    # Execuções da sincronização em segundo plano, com o progresso lido pela interface
+    __tablename__ = 'sync_jobs'
+    id = Column(Integer, primary_key=True)
+    kind = Column(String, nullable=False)
+    status = Column(String, nullable=False, default=JOB_QUEUED)
+    # 'manual' (botão) ou 'schedule' (sincronização periódica)
+    trigger = Column(String, nullable=False, default='manual')
+    progress = Column(Float, nullable=False, default=0)
+    message = Column(String)
+    result = Column(String)
+    error = Column(String)
+    created_at = Column(DateTime, nullable=False, default=datetime.now)
+    started_at = Column(DateTime)
+    finished_at = Column(DateTime)
+    heartbeat_at = Column(DateTime)
+
+    # No máximo um job em andamento por tipo, garantido pelo próprio banco
+    __table_args__ = (
+        Index(
+            'uq_sync_jobs_active_kind', 'kind', unique=True,
+            sqlite_where=_ACTIVE_JOB_WHERE, postgresql_where=_ACTIVE_JOB_WHERE,
+        ),
+    )
+
 # Conexão e criação do banco
-engine = create_engine('sqlite:///finances.db')
-Session = sessionmaker(bind=engine)
-session = Session()
+load_dotenv()
+DATABASE_URL = os.environ.get('DATABASE_URL', 'sqlite:///finances.db')
+DB_POOL_SIZE = int(os.environ.get('DB_POOL_SIZE', 5))
+DB_MAX_OVERFLOW = int(os.environ.get('DB_MAX_OVERFLOW', 10))
+# Tempo (ms) que o SQLite espera por um lock de escrita antes de falhar
+SQLITE_BUSY_TIMEOUT_MS = int(os.environ.get('SQLITE_BUSY_TIMEOUT_MS', 5000))
+
+def _create_engine(url):
+    if not url.startswith('sqlite'):
+        return create_engine(url, pool_size=DB_POOL_SIZE, max_overflow=DB_MAX_OVERFLOW, pool_pre_ping=True)
+
+    # Cada sessão do Streamlit roda em sua própria thread; as conexões vêm do pool, uma por thread
+    engine = create_engine(
+        url,
+        connect_args={'check_same_thread': False, 'timeout': SQLITE_BUSY_TIMEOUT_MS / 1000},
+        pool_size=DB_POOL_SIZE,
+        max_overflow=DB_MAX_OVERFLOW,
+    )
+
+    @event.listens_for(engine, 'connect')
+    def _configure_sqlite(dbapi_connection, connection_record):
+        # WAL permite leituras do dashboard em paralelo com uma importação gravando
+        cursor = dbapi_connection.cursor()
+        cursor.execute('PRAGMA journal_mode=WAL')
+        cursor.execute('PRAGMA synchronous=NORMAL')
+        cursor.execute(f'PRAGMA busy_timeout={SQLITE_BUSY_TIMEOUT_MS}')
+        cursor.close()
+
+    return engine
+
+engine = _create_engine(DATABASE_URL)
+# Latência de cada statement para o painel de performance
+recorder.install(engine)
+# Uma sessão por thread: `session` é um proxy que resolve para a sessão da thread atual
+Session = scoped_session(sessionmaker(bind=engine))
+session = Session
+
+def close_session():
+    # Chamado ao fim de cada rerun para devolver a conexão ao pool
+    Session.remove()
+
+# Cache das leituras, invalidado pelas funções de escrita via versão das tabelas
+QUERY_CACHE_MAX_ENTRIES = 128
+QUERY_CACHE_MAX_BYTES = 256 * 1024 * 1024
+query_cache = QueryCache(QUERY_CACHE_MAX_ENTRIES, QUERY_CACHE_MAX_BYTES)
+
+def get_data_version():
+    return query_cache.data_version
+
+# Maior id de transação visto por este processo, para notar importações feitas por outro
+_seen_transaction_id = None
+
+def refresh_external_writes():
+    """
+    O cache só vê as escritas deste processo. Chamado no início de cada rerun: se o maior id de
+    transactions mudou por fora (ex: `python -m src.importer` com o app rodando), invalida o que
+    depende das transações. Uma consulta pela chave primária; outras escritas externas
+    (recategorização, categorias) só aparecem depois de reiniciar o app.
+    """
+    global _seen_transaction_id
+    last_id = get_last_transaction_id()
+    if _seen_transaction_id is not None and last_id != _seen_transaction_id:
+        query_cache.bump('transactions', 'merchants', 'installment_purchases', 'monthly_category_totals', 'transaction_flags')
+    _seen_transaction_id = last_id
+
+def get_cache_stats():
+    return query_cache.stats()
 
 def create_tables():
     Base.metadata.create_all(engine)
 
+# Migrations do projeto (alembic/ na raiz), usadas para conferir o schema na inicialização
+ALEMBIC_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'alembic')
+_REVISION_LINE = re.compile(r"^(revision|down_revision)\b[^=]*=\s*'([0-9a-f]+)'", re.MULTILINE)
+_schema_lock = threading.Lock()
+_schema_checked = False
+
+def _alembic_config():
+    # Config sem o alembic.ini: o env.py não reconfigura o logging do processo do Streamlit
+    from alembic.config import Config
+    config = Config()
+    config.set_main_option('script_location', ALEMBIC_DIR)
+    config.set_main_option('sqlalchemy.url', DATABASE_URL.replace('%', '%%'))
+    return config
+
+def _migration_heads():
+    """
+    Heads lidos direto dos arquivos de migration (revision/down_revision), sem importar o Alembic.
+    Só serve para o caminho rápido: qualquer divergência cai no `alembic upgrade head`.
+    """
+    revisions, parents = set(), set()
+    for path in glob.glob(os.path.join(ALEMBIC_DIR, 'versions', '*.py')):
+        with open(path, encoding='utf-8') as f:
+            for name, value in _REVISION_LINE.findall(f.read()):
+                (revisions if name == 'revision' else parents).add(value)
+    return revisions - parents
+
+# Migration inicial: o schema que create_tables() gerava antes do Alembic
+BASELINE_REVISION = '223c66b13dd2'
+
+def _current_revisions():
+    with engine.connect() as conn:
+        if not conn.dialect.has_table(conn, 'alembic_version'):
+            return set()
+        return set(conn.execute(text('SELECT version_num FROM alembic_version')).scalars())
+
+def _has_unversioned_tables():
+    # Banco criado por create_tables(): tem as tabelas, mas nunca passou pelo Alembic
+    with engine.connect() as conn:
+        return not conn.dialect.has_table(conn, 'alembic_version') and conn.dialect.has_table(conn, 'transactions')
+
+def ensure_schema():
+    """
+    Confere uma vez por processo se o banco está na última migration e, se não estiver
+    (banco novo ou deploy com migrations pendentes), aplica `alembic upgrade head`. Bancos
+    criados por create_tables() antes das migrations são marcados na initial_schema antes.
+    No caso comum (banco em dia) o Alembic nem é importado; os reruns seguintes não fazem nada.
+    """
+    global _schema_checked
+    if _schema_checked:
+        return
+    with _schema_lock:
+        if _schema_checked:
+            return
+        if _current_revisions() != _migration_heads():
+            from alembic import command
+            config = _alembic_config()
+            # Sem alembic_version a initial_schema rodaria de novo ("table already exists")
+            if _has_unversioned_tables():
+                command.stamp(config, BASELINE_REVISION)
+            command.upgrade(config, 'head')
+        _schema_checked = True
+
 def save_category(category_name = 'Uncategorized'):
     category = Category(name=category_name)
     session.add(category)
     session.commit()
+    query_cache.bump('categories')
 
     return category
 
-def save_keyword(keyword, category_id):
-    keyword = Keyword(word=keyword, category_id=category_id)
+def save_keyword(keyword, category_id, match_type=EXACT):
+    keyword = Keyword(word=keyword, category_id=category_id, match_type=match_type)
     session.add(keyword)
     session.commit()
+    query_cache.bump('keywords')
 
+@timed('query')
+@query_cache.cached('categories')
 def get_categories():
     stmt = select(Category)
-    result = pd.read_sql(stmt, session.bind)
+    result = pd.read_sql(stmt, engine)
 
     return result
 
@@ -71,74 +369,921 @@ def get_category_by_id(id):
 def get_keyword(word):
     return session.query(Keyword).filter_by(word=word).first()
 
-def add_keyword_to_category(category, word):
-    category = get_category(category)
+def add_keyword_to_category(category, word, match_type=EXACT):
+    category_name = category
+    category = get_category(category_name)
     if not category:
-        category = save_category(category)
+        category = save_category(category_name)
 
     word = word.strip()
-    save_keyword(word, category.id)
+    save_keyword(word, category.id, match_type)
     keyword = get_keyword(word)
     return keyword
 
+@timed('query')
+@query_cache.cached('transactions')
 def get_transactions():
     stmt = select(Transaction)
-    result = pd.read_sql(stmt, session.bind)
+    result = pd.read_sql(stmt, engine)
 
     return result
 
+@timed('query')
+@query_cache.cached('keywords')
 def get_keywords():
     stmt = select(Keyword)
-    return pd.read_sql(stmt, session.bind)
+    return pd.read_sql(stmt, engine)
 
-def save_transactions(df):
-    category = None
-    if 'category_id' in df and pd.notnull(df['category_id']):
-        category = get_category_by_id(int(df['category_id']))
-    if not category:
-        category = get_category('Uncategorized')
+@timed('query')
+def get_canonical_titles(raw_titles=None):
+    # Sem raw_titles: a tabela inteira (ex: para semear os processos do importador)
+    if raw_titles is None:
+        with engine.connect() as conn:
+            return dict(conn.execute(select(CanonicalTitle.raw_title, CanonicalTitle.title)).all())
+    raw_titles = list(raw_titles)
+    mapping = {}
+    with engine.connect() as conn:
+        for offset in range(0, len(raw_titles), BULK_CHUNK_SIZE):
+            batch = raw_titles[offset:offset + BULK_CHUNK_SIZE]
+            mapping.update(conn.execute(
+                select(CanonicalTitle.raw_title, CanonicalTitle.title).where(CanonicalTitle.raw_title.in_(batch))
+            ).all())
+    return mapping
+
+def _upsert(conn, table):
+    # INSERT com suporte a ON CONFLICT do dialeto da conexão (PostgreSQL ou SQLite)
+    dialect_insert = postgresql.insert if conn.dialect.name == 'postgresql' else sqlite.insert
+    return dialect_insert(table)
+
+def _insert_canonical_titles(conn, mapping):
+    table = CanonicalTitle.__table__
+    # Uma forma já gravada não é sobrescrita: mudar as regras não reagrupa o histórico
+    conn.execute(
+        _upsert(conn, table).on_conflict_do_nothing(index_elements=[table.c.raw_title]),
+        [{'raw_title': raw_title, 'title': title} for raw_title, title in mapping.items()],
+    )
+
+@timed('write')
+def save_canonical_titles(mapping):
+    with engine.begin() as conn:
+        _insert_canonical_titles(conn, mapping)
+
+# Normalizador de títulos com as formas canônicas persistidas em canonical_titles
+title_normalizer = TitleNormalizer(load=get_canonical_titles, store=save_canonical_titles)
+# Para a importação em streaming: as formas novas são gravadas por save_transaction_chunks na
+# transação do arquivo; gravar por outra conexão no meio dela trava o SQLite (database is locked)
+import_normalizer = title_normalizer.without_store()
+
+# Matcher compilado uma única vez por versão da tabela keywords
+_keyword_matcher = (None, None)
+
+@timed('query')
+def get_keyword_matcher():
+    global _keyword_matcher
+    version = query_cache.version('keywords')
+    if _keyword_matcher[0] != version:
+        rows = session.query(Keyword.word, Keyword.category_id, Keyword.match_type).all()
+        _keyword_matcher = (version, KeywordMatcher(rows, title_normalizer.normalize_many))
+    return _keyword_matcher[1]
+
+def _month_start(value):
+    return value.replace(day=1)
+
+def _next_month(value):
+    return (_month_start(value) + timedelta(days=32)).replace(day=1)
+
+def _add_to_rollup(conn, rows):
+    # Soma os valores do lote ao resumo mês x categoria (upsert)
+    months = pd.to_datetime(rows['date']).dt.to_period('M').dt.to_timestamp().dt.date
+    deltas = (
+        rows.assign(month=months)
+        .groupby(['month', 'category_id'], as_index=False)
+        .agg(total_cents=('amount_cents', 'sum'), count=('amount_cents', 'size'))
+    )
+    table = MonthlyCategoryTotal.__table__
+    stmt = _upsert(conn, table)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[table.c.month, table.c.category_id],
+        set_={
+            'total_cents': table.c.total_cents + stmt.excluded.total_cents,
+            'count': table.c.count + stmt.excluded.count,
+        },
+    )
+    conn.execute(stmt, deltas.to_dict('records'))
+
+def _refresh_rollup(conn, months):
+    # Recalcula só os meses afetados, cada um pelo índice em transactions.date
+    table = MonthlyCategoryTotal.__table__
+    transactions = Transaction.__table__
+    for month in sorted(set(months)):
+        conn.execute(delete(table).where(table.c.month == month))
+        totals = conn.execute(
+            select(transactions.c.category_id, func.sum(transactions.c.amount_cents), func.count())
+            .where(transactions.c.date >= month, transactions.c.date < _next_month(month))
+            .where(transactions.c.category_id.is_not(None))
+            .group_by(transactions.c.category_id)
+        ).all()
+        if totals:
+            conn.execute(insert(table), [
+                {'month': month, 'category_id': category_id, 'total_cents': total, 'count': count}
+                for category_id, total, count in totals
+            ])
+
+def _affected_months(conn, condition):
+    dates = conn.execute(select(Transaction.date).where(condition).distinct()).scalars()
+    return {_month_start(value) for value in dates}
+
+# Quantidade de linhas enviadas por executemany na importação em massa
+BULK_CHUNK_SIZE = 5000
+
+def _default_category_id():
+    category = get_category('Uncategorized')
     if not category:
         category = save_category()
-    df['category_id'] = category.id
-    session = Session()
-    for _, row in df.iterrows():
-        transaction = Transaction(
-            date=row['date'],
-            title=row['title'],
-            amount=row['amount'],
-            category_id=row['category_id']
-        )
-        session.add(transaction)
-    session.commit()
-    session.close()
-
-def get_transactions_data():
-    results = session.query(
-        Transaction.title,
-        Transaction.date,
-        Transaction.amount,
-        Category.name
-    ).join(Category).all()
-
-    # Converter para DataFrame
-    df = pd.DataFrame(results, columns=['title', 'date', 'amount', 'category'])
-    df["date"] = pd.to_datetime(df["date"])
-    df["amount"] = pd.to_numeric(df["amount"], errors="coerce")
+    return category.id
+
+def _occurrences(df, seen):
+    """
+    Numera compras idênticas no mesmo dia (ex: dois cafés iguais) para que não colidam no hash.
+    `seen` guarda quantas vezes cada chave já apareceu nos lotes anteriores do mesmo arquivo.
+    """
+    raw_title = df['raw_title'] if 'raw_title' in df else df['title']
+    keys = pd.DataFrame({
+        'date': pd.to_datetime(df['date']).dt.date,
+        'title': raw_title.astype(str),
+        'amount': pd.to_numeric(df['amount']).round(2),
+    }, index=df.index)
+    grouped = keys.groupby(['date', 'title', 'amount'], sort=False)
+    occurrences = grouped.cumcount()
+    sizes = grouped.size()
+    if seen:
+        offsets = pd.Series([seen.get(key, 0) for key in sizes.index], index=sizes.index)
+        occurrences += offsets.reindex(pd.MultiIndex.from_frame(keys)).to_numpy()
+    for key, count in sizes.items():
+        seen[key] = seen.get(key, 0) + count
+    return occurrences
+
+def _import_hashes(chunk, occurrences):
+    # Usa o título original do arquivo (quando disponível) para o hash não mudar se a normalização mudar
+    raw_title = chunk['raw_title'] if 'raw_title' in chunk else chunk['title']
+    keys = (
+        pd.to_datetime(chunk['date']).dt.strftime('%Y-%m-%d')
+        + '|' + raw_title.astype(str)
+        + '|' + pd.to_numeric(chunk['amount']).map('{:.2f}'.format)
+        + '|' + occurrences.astype(str)
+    )
+    return [hashlib.sha1(key.encode('utf-8')).hexdigest() for key in keys]
+
+# Linhas gravadas antes do import_hash (migration 2bce51533abb) têm um hash "legado", calculado sobre
+# o título como o app gravava na época (minúsculas, sem "- Parcela N/M"): o título original se perdeu
+LEGACY_HASH_PREFIX = 'legacy:'
+LEGACY_PARCEL_PATTERN = r'\s*- Parcela\s*\d+/\d+'
+_has_legacy_rows = None
+
+def _legacy_rows_exist(conn):
+    # Conferido uma vez por processo: depois da migration não surgem linhas legadas novas
+    global _has_legacy_rows
+    if _has_legacy_rows is None:
+        # Faixa 'legacy:' .. 'legacy;' no índice único (hashes normais são hexadecimais)
+        stmt = select(Transaction.id).where(
+            Transaction.import_hash >= LEGACY_HASH_PREFIX, Transaction.import_hash < 'legacy;'
+        ).limit(1)
+        _has_legacy_rows = conn.execute(stmt).first() is not None
+    return _has_legacy_rows
+
+def _legacy_hashes(chunk, seen):
+    raw_title = chunk['raw_title'] if 'raw_title' in chunk else chunk['title']
+    titles = raw_title.astype(str).str.replace(LEGACY_PARCEL_PATTERN, '', regex=True).str.lower().str.strip()
+    legacy = pd.DataFrame({'date': chunk['date'], 'raw_title': titles, 'amount': chunk['amount']})
+    hashes = _import_hashes(legacy, _occurrences(legacy, seen))
+    return [LEGACY_HASH_PREFIX + digest[:40 - len(LEGACY_HASH_PREFIX)] for digest in hashes]
+
+def _merchant_ids(conn, names, merchant_ids):
+    """
+    Mapeia os títulos para ids de merchants, criando os que faltam.
+    `merchant_ids` é o dicionário nome -> id acumulado ao longo da importação.
+    """
+    table = Merchant.__table__
+    codes, uniques = pd.factorize(names.astype(str))
+    missing = [name for name in uniques if name not in merchant_ids]
+    if missing:
+        merchant_ids.update(conn.execute(select(table.c.name, table.c.id).where(table.c.name.in_(missing))).all())
+        new = [name for name in missing if name not in merchant_ids]
+        if new:
+            conn.execute(insert(table), [{'name': name} for name in new])
+            merchant_ids.update(conn.execute(select(table.c.name, table.c.id).where(table.c.name.in_(new))).all())
+    ids = pd.Index([merchant_ids[name] for name in uniques], dtype='int64')
+    return pd.Series(ids.take(codes), index=names.index)
+
+def to_cents(amount):
+    # Reais (float ou texto) -> centavos inteiros, arredondando uma única vez na entrada
+    return (pd.to_numeric(amount) * 100).round().astype('int64')
+
+def _transaction_rows(chunk, category_ids, import_hashes, merchant_ids):
+    # Converte só o lote atual para dicts, mantendo a memória limitada ao tamanho do lote
+    rows = pd.DataFrame({
+        'date': pd.to_datetime(chunk['date']).dt.date,
+        'merchant_id': merchant_ids,
+        'amount_cents': to_cents(chunk['amount']),
+        'category_id': category_ids.astype(int),
+        'import_hash': import_hashes,
+    })
+    # Parcela já separada do título por title_normalize; lotes sem as colunas são compras à vista
+    for column in ('installment_number', 'installment_total'):
+        values = chunk[column] if column in chunk else pd.NA
+        rows[column] = pd.Series(values, index=rows.index, dtype='Int64')
+    return rows
+
+INSTALLMENT_SERIES_KEY = ['merchant_id', 'amount_cents', 'installment_total', 'purchase_month']
+# Parcelas de uma compra podem diferir por arredondamento (33,34 + 33,33 + 33,33): mesma série
+INSTALLMENT_CENT_TOLERANCE = 1
+
+def _near_series(key, known):
+    # A série em `known` com o mesmo estabelecimento, parcelas e mês e valor a até INSTALLMENT_CENT_TOLERANCE
+    merchant_id, amount_cents, total, month = key
+    for delta in sorted(range(-INSTALLMENT_CENT_TOLERANCE, INSTALLMENT_CENT_TOLERANCE + 1), key=abs):
+        candidate = (merchant_id, amount_cents + delta, total, month)
+        if candidate in known:
+            return candidate
+    return None
+
+def _month_dates(ordinals):
+    # Ordinais de pd.Period mensal -> date do primeiro dia do mês
+    return pd.PeriodIndex.from_ordinals(ordinals, freq='M').to_timestamp().date
+
+def _load_purchase_ids(conn, keys, purchase_ids):
+    # Busca pelas colunas do índice único (merchant_id primeiro); o que vier a mais só completa o dicionário
+    table = InstallmentPurchase.__table__
+    stmt = select(*[table.c[key] for key in INSTALLMENT_SERIES_KEY], table.c.id).where(
+        table.c.merchant_id.in_({key[0] for key in keys}),
+        table.c.purchase_month.in_({key[3] for key in keys}),
+    )
+    purchase_ids.update((tuple(row[:-1]), row[-1]) for row in conn.execute(stmt))
+
+def _purchase_ids(conn, rows, purchase_ids):
+    """
+    Liga cada parcela do lote à compra original em installment_purchases, criando as séries novas.
+    `purchase_ids` é o dicionário série -> id acumulado ao longo da importação.
+    """
+    ids = pd.Series(pd.NA, index=rows.index, dtype='Int64')
+    parcels = rows[rows['installment_number'].notna() & rows['installment_total'].notna()]
+    if parcels.empty:
+        return ids
+
+    number = parcels['installment_number'].astype('int64')
+    total = parcels['installment_total'].astype('int64')
+    # Mês da compra = mês da parcela menos as parcelas anteriores
+    origin = pd.to_datetime(parcels['date']).dt.to_period('M').astype('int64') - (number - 1)
+    keys = list(zip(
+        parcels['merchant_id'].tolist(), parcels['amount_cents'].tolist(), total.tolist(), _month_dates(origin)
+    ))
+    series = dict(zip(keys, (origin + total - 1).tolist()))
+    missing = [key for key in series if _near_series(key, purchase_ids) is None]
+    if missing:
+        _load_purchase_ids(conn, missing, purchase_ids)
+        # Em ordem de valor: parcelas vizinhas por um centavo criam uma única série
+        new = set()
+        for key in sorted(missing):
+            if _near_series(key, purchase_ids) is None and _near_series(key, new) is None:
+                new.add(key)
+        if new:
+            new = list(new)
+            final_months = _month_dates([series[key] for key in new])
+            conn.execute(insert(InstallmentPurchase.__table__), [
+                {**dict(zip(INSTALLMENT_SERIES_KEY, key)), 'final_month': final_month}
+                for key, final_month in zip(new, final_months)
+            ])
+            _load_purchase_ids(conn, new, purchase_ids)
+    # Valores a um centavo da série gravada passam a apontar para o mesmo id
+    for key in series:
+        if key not in purchase_ids:
+            purchase_ids[key] = purchase_ids[_near_series(key, purchase_ids)]
+    ids[parcels.index] = [purchase_ids[key] for key in keys]
+    return ids
+
+def _insert_records(rows):
+    # Cada coluna vira lista Python de uma vez; NA das colunas opcionais (Int64) vira None para o driver
+    columns = [rows[name].to_numpy(dtype=object, na_value=None).tolist() for name in rows.columns]
+    return [dict(zip(rows.columns, values)) for values in zip(*columns)]
+
+def _existing_hashes(conn, import_hashes):
+    stmt = select(Transaction.import_hash).where(Transaction.import_hash.in_(import_hashes))
+    return set(conn.execute(stmt).scalars())
+
+def save_transactions(df, chunk_size=BULK_CHUNK_SIZE):
+    chunks = (df.iloc[offset:offset + chunk_size] for offset in range(0, len(df), chunk_size))
+    return save_transaction_chunks(chunks)
+
+def save_transaction_chunks(chunks):
+    """
+    Grava lotes de transações (DataFrames com date, title, amount) numa única transação.
+    Aceita um iterador, então o arquivo pode ser lido em pedaços sem nunca estar inteiro na memória.
+    Retorna a quantidade de transações novas.
+    """
+    # Span em vez de @timed: o painel de performance mostra as linhas lidas (novas + já existentes)
+    with span('src.models.save_transaction_chunks', 'write') as info:
+        inserted, skipped = _save_transaction_chunks(chunks)
+        info['rows'] = inserted + skipped
+    return inserted
+
+def _save_transaction_chunks(chunks):
+    default_category_id = _default_category_id()
+    matcher = get_keyword_matcher()
+    seen = {}
+    legacy_seen = {}
+    merchant_ids = {}
+    purchase_ids = {}
+
+    inserted = 0
+    skipped = 0
+    # Uma única transação para o arquivo inteiro, com inserts Core em lotes
+    with engine.begin() as conn:
+        check_legacy = _legacy_rows_exist(conn)
+        for chunk in chunks:
+            if chunk.empty:
+                continue
+            if 'raw_title' in chunk:
+                pairs = chunk[['raw_title', 'title']].drop_duplicates('raw_title')
+                _insert_canonical_titles(conn, dict(zip(pairs['raw_title'], pairs['title'])))
+            # Categoria informada no arquivo > regra de palavra-chave > Uncategorized
+            category_ids = matcher.categorize(chunk['title'])
+            if 'category_id' in chunk:
+                category_ids = chunk['category_id'].astype('Int64').fillna(category_ids)
+            category_ids = category_ids.fillna(default_category_id)
+
+            import_hashes = _import_hashes(chunk, _occurrences(chunk, seen))
+            rows = _transaction_rows(
+                chunk, category_ids, import_hashes, _merchant_ids(conn, chunk['title'], merchant_ids)
+            )
+
+            # Busca pelo índice único só os hashes deste lote, sem varrer a tabela
+            existing = _existing_hashes(conn, import_hashes)
+            # Linhas de antes do import_hash só são reconhecidas pelo hash legado
+            if check_legacy:
+                legacy_hashes = _legacy_hashes(chunk, legacy_seen)
+                found = _existing_hashes(conn, legacy_hashes)
+                existing.update(digest for digest, legacy in zip(import_hashes, legacy_hashes) if legacy in found)
+            if existing:
+                rows = rows[~rows['import_hash'].isin(existing)]
+                skipped += len(existing)
+            if rows.empty:
+                continue
+
+            rows = rows.assign(purchase_id=_purchase_ids(conn, rows, purchase_ids))
+            conn.execute(insert(Transaction), _insert_records(rows))
+            _add_to_rollup(conn, rows)
+            inserted += len(rows)
+
+    if inserted:
+        query_cache.bump('transactions', 'merchants', 'installment_purchases', 'monthly_category_totals')
+    return inserted, skipped
+
+def _as_date(value):
+    return pd.Timestamp(value).date() if value is not None else None
+
+# Backend do DataFrame de transações: 'numpy' (padrão) ou 'pyarrow' (requer o pacote pyarrow)
+TRANSACTIONS_DTYPE_BACKEND = os.getenv('TRANSACTIONS_DTYPE_BACKEND', 'numpy')
+
+def _names(model, ids=None):
+    stmt = select(model.id, model.name)
+    # Para poucas linhas (uma página) busca só os nomes usados; senão a tabela inteira
+    if ids is not None:
+        stmt = stmt.where(model.id.in_([int(value) for value in ids]))
+    with engine.connect() as conn:
+        return dict(conn.execute(stmt).all())
+
+def _categorical(ids, names, dtype_backend):
+    # Cada linha guarda só o código inteiro; o texto fica uma vez por nome nas categorias
+    codes, uniques = pd.factorize(ids)
+    categories = pd.Index([names[value] for value in uniques], dtype=object)
+    if dtype_backend == 'pyarrow':
+        categories = categories.astype('string[pyarrow]')
+    return pd.Categorical.from_codes(codes, categories)
+
+def _transactions_query(start_dt=None, end_dt=None):
+    stmt = (
+        select(Transaction.merchant_id, Transaction.date, Transaction.amount_cents, Transaction.category_id)
+        .where(Transaction.category_id.is_not(None))
+    )
+    # O período vai para o WHERE e usa o índice em transactions.date
+    if start_dt is not None:
+        stmt = stmt.where(Transaction.date >= _as_date(start_dt))
+    if end_dt is not None:
+        stmt = stmt.where(Transaction.date <= _as_date(end_dt))
+    return stmt
+
+def _transactions_frame(stmt, dtype_backend=None, lookup_ids=False):
+    dtype_backend = dtype_backend or TRANSACTIONS_DTYPE_BACKEND
+    # Lê só inteiros e datas; os nomes vêm uma vez por merchant/categoria
+    rows = pd.read_sql(stmt, engine, dtype={'merchant_id': 'int64', 'amount_cents': 'int64', 'category_id': 'int64'})
+    merchant_ids = rows['merchant_id'].unique() if lookup_ids else None
+    category_ids = rows['category_id'].unique() if lookup_ids else None
+
+    df = pd.DataFrame({
+        'title': _categorical(rows['merchant_id'], _names(Merchant, merchant_ids), dtype_backend),
+        'date': pd.to_datetime(rows['date']),
+        'amount_cents': rows['amount_cents'],
+        'category': _categorical(rows['category_id'], _names(Category, category_ids), dtype_backend),
+    })
+    # Colunas a mais no SELECT (ex: id) passam como vieram
+    for column in rows.columns.difference(['merchant_id', 'date', 'amount_cents', 'category_id']):
+        df[column] = rows[column]
+    if dtype_backend == 'pyarrow':
+        df = df.astype({'date': 'timestamp[ns][pyarrow]', 'amount_cents': 'int64[pyarrow]'})
     return df
 
+@timed('query')
+@query_cache.cached('transactions', 'categories', 'merchants')
+def get_transactions_data(start_dt=None, end_dt=None, dtype_backend=None):
+    """
+    Transações do período num DataFrame compacto: title e category categóricos,
+    date datetime64 e amount_cents int64. Com dtype_backend='pyarrow' as colunas
+    numéricas e as categorias de texto ficam em memória Arrow.
+    """
+    return _transactions_frame(_transactions_query(start_dt, end_dt), dtype_backend)
+
+@timed('query')
+@query_cache.cached('transactions')
+def count_transactions(start_dt=None, end_dt=None):
+    stmt = select(func.count()).select_from(_transactions_query(start_dt, end_dt).subquery())
+    with engine.connect() as conn:
+        return conn.execute(stmt).scalar_one()
+
+@timed('query')
+@query_cache.cached('transactions', 'categories', 'merchants')
+def get_transactions_page(start_dt=None, end_dt=None, page=0, page_size=100, dtype_backend=None):
+    """
+    Uma página das transações do período, mais recentes primeiro.
+    LIMIT/OFFSET ficam no banco: só as linhas da página chegam ao pandas e ao navegador.
+    """
+    stmt = (
+        _transactions_query(start_dt, end_dt)
+        .order_by(Transaction.date.desc(), Transaction.id.desc())
+        .offset(page * page_size)
+        .limit(page_size)
+    )
+    return _transactions_frame(stmt, dtype_backend, lookup_ids=True)
+
+ROLLUP_COLUMNS = ['month', 'category', 'amount_cents', 'count']
+
+def _category_totals(start_dt, end_dt):
+    # Trecho parcial de um mês, agregado direto das transações
+    stmt = (
+        select(Category.name, func.sum(Transaction.amount_cents), func.count())
+        .join(Category)
+        .where(Transaction.date >= start_dt, Transaction.date <= end_dt)
+        .group_by(Category.name)
+    )
+    with engine.connect() as conn:
+        rows = conn.execute(stmt).all()
+    return pd.DataFrame(
+        [(_month_start(start_dt), name, total, count) for name, total, count in rows],
+        columns=ROLLUP_COLUMNS,
+    )
+
+@timed('query')
+@query_cache.cached('monthly_category_totals', 'transactions', 'categories')
+def get_monthly_category_totals(start_dt=None, end_dt=None):
+    """
+    Totais por mês x categoria no período, lidos do resumo pré-agregado.
+    Só os meses incompletos nas pontas do período são agregados a partir das transações.
+    """
+    start = _as_date(start_dt)
+    end = _as_date(end_dt)
+    if start and end and start > end:
+        return pd.DataFrame(columns=ROLLUP_COLUMNS)
+
+    # Meses inteiros dentro do período: [first_full, after_full)
+    first_full = None if start is None else (start if start.day == 1 else _next_month(start))
+    after_full = None
+    if end is not None:
+        after_full = _next_month(end) if (end + timedelta(days=1)).day == 1 else _month_start(end)
+
+    stmt = (
+        select(MonthlyCategoryTotal.month, Category.name, MonthlyCategoryTotal.total_cents, MonthlyCategoryTotal.count)
+        .join(Category)
+    )
+    if first_full is not None:
+        stmt = stmt.where(MonthlyCategoryTotal.month >= first_full)
+    if after_full is not None:
+        stmt = stmt.where(MonthlyCategoryTotal.month < after_full)
+    parts = [pd.read_sql(stmt, engine).set_axis(ROLLUP_COLUMNS, axis=1)]
+
+    if start is not None and start < first_full:
+        parts.append(_category_totals(start, min(first_full - timedelta(days=1), end or first_full)))
+    if end is not None:
+        tail_start = after_full if first_full is None else max(after_full, first_full)
+        if tail_start <= end:
+            parts.append(_category_totals(tail_start, end))
+
+    parts = [part for part in parts if not part.empty]
+    df = pd.concat(parts, ignore_index=True) if parts else pd.DataFrame(columns=ROLLUP_COLUMNS)
+    return df.astype({'month': 'datetime64[ns]', 'amount_cents': 'int64', 'count': 'int64'})
+
+@timed('query')
+@query_cache.cached('transactions', 'merchants')
+def get_top_merchants(start_dt=None, end_dt=None, limit=10):
+    # Agrupa por merchant_id (inteiro) no banco e só depois busca os nomes
+    totals = (
+        select(Transaction.merchant_id, func.sum(Transaction.amount_cents).label('amount_cents'))
+        .group_by(Transaction.merchant_id)
+        .order_by(func.abs(func.sum(Transaction.amount_cents)).desc())
+        .limit(limit)
+    )
+    if start_dt is not None:
+        totals = totals.where(Transaction.date >= _as_date(start_dt))
+    if end_dt is not None:
+        totals = totals.where(Transaction.date <= _as_date(end_dt))
+    totals = totals.subquery()
+    stmt = select(Merchant.name.label('title'), totals.c.amount_cents).join(totals, Merchant.id == totals.c.merchant_id)
+    return pd.read_sql(stmt, engine)
+
+@timed('query')
+@query_cache.cached('transactions', 'installment_purchases', 'categories', 'merchants')
+def get_outstanding_installments(start_dt=None):
+    """
+    Compras parceladas com parcelas a partir do mês de `start_dt` (padrão: mês atual), uma linha
+    por compra: title, category, amount_cents (por parcela), installment_total, purchase_month e
+    paid (última parcela lançada). As compras vêm do índice em installment_purchases.final_month
+    e as parcelas lançadas do índice (purchase_id, installment_number), sem reler títulos.
+    """
+    month = _month_start(_as_date(start_dt) or date.today())
+    purchases = InstallmentPurchase.__table__
+    open_purchases = select(purchases.c.id).where(purchases.c.final_month >= month)
+    paid = (
+        select(
+            Transaction.purchase_id,
+            func.max(Transaction.installment_number).label('paid'),
+            func.max(Transaction.category_id).label('category_id'),
+            # O centavo do arredondamento costuma ir na primeira parcela: as próximas saem pelo menor valor
+            func.min(Transaction.amount_cents).label('amount_cents'),
+        )
+        .where(Transaction.purchase_id.in_(open_purchases))
+        .group_by(Transaction.purchase_id)
+        .subquery()
+    )
+    stmt = (
+        select(
+            purchases.c.id.label('purchase_id'), purchases.c.merchant_id, paid.c.category_id,
+            paid.c.amount_cents, purchases.c.installment_total, purchases.c.purchase_month, paid.c.paid,
+        )
+        .join(paid, paid.c.purchase_id == purchases.c.id)
+        .where(purchases.c.final_month >= month)
+    )
+    rows = pd.read_sql(stmt, engine, dtype={'amount_cents': 'int64', 'installment_total': 'int64', 'paid': 'int64'})
+    return pd.DataFrame({
+        'purchase_id': rows['purchase_id'],
+        'title': rows['merchant_id'].map(_names(Merchant, rows['merchant_id'].unique())),
+        'category': rows['category_id'].map(_names(Category, rows['category_id'].dropna().unique())),
+        'amount_cents': rows['amount_cents'],
+        'installment_total': rows['installment_total'],
+        'purchase_month': pd.to_datetime(rows['purchase_month']),
+        'paid': rows['paid'],
+    })
+
+@timed('query')
+@query_cache.cached('transactions', 'categories')
+def get_installment_payments(start_dt=None, end_dt=None):
+    """Parcelas já lançadas, somadas por dia x categoria (para separar o que é parcela no histórico)."""
+    # IN sobre as compras parceladas: o SQLite usa o índice parcial em vez de varrer transactions pela data
+    stmt = (
+        select(Transaction.date, Category.name.label('category'), func.sum(Transaction.amount_cents).label('amount_cents'))
+        .join(Category)
+        .where(Transaction.purchase_id.in_(select(InstallmentPurchase.id)))
+        .group_by(Transaction.date, Category.name)
+    )
+    if start_dt is not None:
+        stmt = stmt.where(Transaction.date >= _as_date(start_dt))
+    if end_dt is not None:
+        stmt = stmt.where(Transaction.date <= _as_date(end_dt))
+    return pd.read_sql(stmt, engine, parse_dates=['date'], dtype={'amount_cents': 'int64'})
+
+@timed('query')
+def get_scoring_frame(after_id=0):
+    """
+    Frame no formato de get_transactions_data (mais id e installment) com o histórico inteiro
+    dos merchants que têm transações com id > after_id: as estatísticas por título precisam
+    das cobranças anteriores, mas só os merchants com lançamentos novos são lidos.
+    """
+    merchants = select(Transaction.merchant_id).where(Transaction.id > after_id).distinct()
+    stmt = (
+        _transactions_query()
+        .add_columns(Transaction.id, Transaction.purchase_id.is_not(None).label('installment'))
+        .where(Transaction.merchant_id.in_(merchants))
+    )
+    df = _transactions_frame(stmt, 'numpy')
+    return df.astype({'installment': bool})
+
+def get_last_transaction_id():
+    with engine.connect() as conn:
+        return conn.execute(select(func.max(Transaction.id))).scalar() or 0
+
+# Marcador em sync_state: maior id de transação já avaliado por src.anomalies
+FLAGS_SCORED_KEY = 'transaction_flags_scored_id'
+
+def get_flags_watermark():
+    return int(get_sync_state(FLAGS_SCORED_KEY, 0))
+
+@timed('write')
+def save_transaction_flags(flags, scored_through):
+    """
+    Grava os alertas novos (transaction_id, kind, score, expected_cents) e avança o marcador
+    na mesma transação: uma falha no meio não deixa linhas avaliadas sem registro.
+    """
+    table = TransactionFlag.__table__
+    state = SyncState.__table__
+    with engine.begin() as conn:
+        if not flags.empty:
+            conn.execute(
+                _upsert(conn, table).on_conflict_do_nothing(index_elements=[table.c.transaction_id, table.c.kind]),
+                _insert_records(flags.assign(flagged_at=datetime.now())),
+            )
+        stmt = _upsert(conn, state).values(key=FLAGS_SCORED_KEY, value=str(scored_through))
+        conn.execute(stmt.on_conflict_do_update(index_elements=[state.c.key], set_={'value': stmt.excluded.value}))
+    session.expire_all()
+    query_cache.bump('transaction_flags')
+
+@timed('query')
+@query_cache.cached('transaction_flags', 'transactions', 'categories', 'merchants')
+def get_transaction_flags(start_dt=None, end_dt=None):
+    """Alertas das transações do período, mais recentes primeiro."""
+    stmt = (
+        select(
+            TransactionFlag.kind, TransactionFlag.score, TransactionFlag.expected_cents,
+            Transaction.id, Transaction.date, Merchant.name.label('title'), Transaction.amount_cents,
+            Category.name.label('category'),
+        )
+        .join(Transaction, Transaction.id == TransactionFlag.transaction_id)
+        .join(Merchant, Merchant.id == Transaction.merchant_id)
+        .outerjoin(Category, Category.id == Transaction.category_id)
+        .order_by(Transaction.date.desc(), Transaction.id.desc())
+    )
+    if start_dt is not None:
+        stmt = stmt.where(Transaction.date >= _as_date(start_dt))
+    if end_dt is not None:
+        stmt = stmt.where(Transaction.date <= _as_date(end_dt))
+    return pd.read_sql(stmt, engine, parse_dates=['date'])
+
+def _keyword_condition(keyword):
+    # Mesma forma canônica que o KeywordMatcher usa na importação: os nomes em merchants já estão normalizados
+    word = normalize_keyword(title_normalizer.normalize(keyword.word))
+    if not word:
+        names = false()
+    elif keyword.match_type == PREFIX:
+        names = Merchant.name.startswith(word, autoescape=True)
+    elif keyword.match_type == CONTAINS:
+        names = Merchant.name.contains(word, autoescape=True)
+    else:
+        names = Merchant.name == word
+    # A regra de texto vira um conjunto de merchant_id; o UPDATE usa o índice inteiro
+    return Transaction.merchant_id.in_(select(Merchant.id).where(names))
+
+@timed('write')
 def update_transactions(keyword):
+    condition = _keyword_condition(keyword)
     stmt = (
         update(Transaction)
-        .where(Transaction.title == keyword.word)
+        .where(condition)
         .values(category_id=keyword.category_id)
     )
-    session.execute(stmt)
-    session.commit()
+    with engine.begin() as conn:
+        months = _affected_months(conn, condition)
+        conn.execute(stmt)
+        _refresh_rollup(conn, months)
+    session.expire_all()
+    query_cache.bump('transactions', 'monthly_category_totals')
+
+@timed('write')
+def recategorize_transactions(changes):
+    """
+    Aplica em lote as mudanças do editor: `changes` tem as colunas title e category.
+    Cria categorias e palavras-chave que faltam e atualiza as transações numa única transação.
+    """
+    changes = changes.drop_duplicates('title', keep='last')
+    if changes.empty:
+        return 0
+
+    titles = changes['title'].astype(str).str.strip()
+    names = changes['category'].astype(str)
+    categories = Category.__table__
+    keywords = Keyword.__table__
+    transactions = Transaction.__table__
+
+    with engine.begin() as conn:
+        category_ids = dict(conn.execute(
+            select(categories.c.name, categories.c.id).where(categories.c.name.in_(names.unique()))
+        ).all())
+        missing = [name for name in names.unique() if name not in category_ids]
+        if missing:
+            conn.execute(insert(categories), [{'name': name} for name in missing])
+            category_ids.update(conn.execute(
+                select(categories.c.name, categories.c.id).where(categories.c.name.in_(missing))
+            ).all())
 
+        rows = pd.DataFrame({'title': titles.values, 'category_id': names.map(category_ids).values})
+
+        # Palavra-chave já existente para o título só troca de categoria
+        existing_words = set(conn.execute(
+            select(keywords.c.word).where(keywords.c.word.in_(rows['title']))
+        ).scalars())
+        is_existing = rows['title'].isin(existing_words)
+        if is_existing.any():
+            conn.execute(
+                update(keywords)
+                .where(keywords.c.word == bindparam('b_word'))
+                .values(category_id=bindparam('b_category_id')),
+                rows[is_existing].rename(columns={'title': 'b_word', 'category_id': 'b_category_id'}).to_dict('records'),
+            )
+        if (~is_existing).any():
+            conn.execute(
+                insert(keywords),
+                rows[~is_existing].rename(columns={'title': 'word'}).to_dict('records'),
+            )
+
+        merchants = dict(conn.execute(
+            select(Merchant.name, Merchant.id).where(Merchant.name.in_(rows['title']))
+        ).all())
+        rows['merchant_id'] = rows['title'].map(merchants)
+        rows = rows.dropna(subset=['merchant_id']).astype({'merchant_id': int})
+
+        months = _affected_months(conn, Transaction.merchant_id.in_(rows['merchant_id']))
+        # UPDATE em lote pela chave inteira, apoiado pelo índice em transactions.merchant_id
+        result = conn.execute(
+            update(transactions)
+            .where(transactions.c.merchant_id == bindparam('b_merchant_id'))
+            .values(category_id=bindparam('b_category_id')),
+            rows[['merchant_id', 'category_id']]
+            .rename(columns={'merchant_id': 'b_merchant_id', 'category_id': 'b_category_id'})
+            .to_dict('records'),
+        )
+        _refresh_rollup(conn, months)
+
+    session.expire_all()
+    query_cache.bump('categories', 'keywords', 'transactions', 'monthly_category_totals')
+    return result.rowcount
+
+@timed('write')
 def delete_category(id):
     category = get_category_by_id(id)
     if category:
         session.delete(category)
+        # Transações órfãs somem do join em get_transactions_data; o resumo acompanha
+        session.execute(delete(MonthlyCategoryTotal).where(MonthlyCategoryTotal.category_id == id))
         session.commit()
+        # As palavras-chave e o orçamento foram removidos em cascata; as transações ficaram sem categoria
+        query_cache.bump('categories', 'keywords', 'budgets', 'transactions', 'monthly_category_totals')
         return True
-    return False
\ No newline at end of file
+    return False
+
+# Fração do limite que dispara o alerta quando o orçamento não define uma
+DEFAULT_ALERT_RATIO = 0.8
+
+@timed('query')
+@query_cache.cached('budgets', 'categories')
+def get_budgets():
+    stmt = (
+        select(Category.name.label('category'), Budget.limit_cents, Budget.alert_ratio)
+        .join(Category)
+        .order_by(Category.name)
+    )
+    return pd.read_sql(stmt, engine, dtype={'limit_cents': 'int64', 'alert_ratio': 'float64'})
+
+@timed('write')
+def save_budgets(budgets):
+    """
+    Grava os orçamentos do editor: `budgets` tem category, limit_cents e alert_ratio.
+    Categoria com limite vazio ou zero fica sem orçamento.
+    """
+    table = Budget.__table__
+    budgets = budgets.drop_duplicates('category', keep='last')
+    with engine.begin() as conn:
+        category_ids = dict(conn.execute(
+            select(Category.name, Category.id).where(Category.name.in_(budgets['category'].astype(str)))
+        ).all())
+        rows = budgets.assign(category_id=budgets['category'].map(category_ids)).dropna(subset=['category_id'])
+        has_limit = rows['limit_cents'].fillna(0) > 0
+        removed = rows.loc[~has_limit, 'category_id'].astype(int).tolist()
+        if removed:
+            conn.execute(delete(table).where(table.c.category_id.in_(removed)))
+        rows = rows[has_limit]
+        if not rows.empty:
+            stmt = _upsert(conn, table)
+            conn.execute(
+                stmt.on_conflict_do_update(
+                    index_elements=[table.c.category_id],
+                    set_={'limit_cents': stmt.excluded.limit_cents, 'alert_ratio': stmt.excluded.alert_ratio},
+                ),
+                pd.DataFrame({
+                    'category_id': rows['category_id'].astype(int),
+                    'limit_cents': rows['limit_cents'].astype('int64'),
+                    'alert_ratio': rows['alert_ratio'].fillna(DEFAULT_ALERT_RATIO).astype(float),
+                }).to_dict('records'),
+            )
+    query_cache.bump('budgets')
+    return len(rows)
+
+def get_processed_message_ids(message_ids):
+    message_ids = list(message_ids)
+    processed = set()
+    with engine.connect() as conn:
+        for offset in range(0, len(message_ids), BULK_CHUNK_SIZE):
+            batch = message_ids[offset:offset + BULK_CHUNK_SIZE]
+            processed.update(conn.execute(
+                select(GmailMessage.id).where(GmailMessage.id.in_(batch))
+            ).scalars())
+    return processed
+
+def mark_message_processed(message_id, history_id=None):
+    session.merge(GmailMessage(id=message_id, history_id=history_id, processed_at=datetime.now()))
+    session.commit()
+
+def get_sync_state(key, default=None):
+    state = session.get(SyncState, key)
+    return state.value if state else default
+
+def set_sync_state(key, value):
+    session.merge(SyncState(key=key, value=value))
+    session.commit()
+
+def get_uploaded_files(hashes, names):
+    # Retorna (hashes, nomes) já registrados como enviados ao Drive
+    stmt = select(UploadedFile.sha256, UploadedFile.name).where(
+        UploadedFile.sha256.in_(list(hashes)) | UploadedFile.name.in_(list(names))
+    )
+    with engine.connect() as conn:
+        rows = conn.execute(stmt).all()
+    return {sha256 for sha256, _ in rows}, {name for _, name in rows}
+
+def save_uploaded_file(sha256, name, drive_file_id, size):
+    session.add(UploadedFile(sha256=sha256, name=name, drive_file_id=drive_file_id, size=size))
+    session.commit()
+
+def get_imported_checksums(hashes):
+    stmt = select(ImportedFile.sha256).where(ImportedFile.sha256.in_(list(hashes)))
+    with engine.connect() as conn:
+        return set(conn.execute(stmt).scalars())
+
+def save_imported_file(sha256, name, rows):
+    session.add(ImportedFile(sha256=sha256, name=name, rows=rows))
+    session.commit()
+
+# Job em andamento sem sinal de vida há mais que isso é considerado interrompido (ex: servidor reiniciado)
+JOB_STALE_AFTER = timedelta(minutes=int(os.environ.get('JOB_STALE_AFTER_MINUTES', 15)))
+
+def _job_dict(row):
+    return dict(row._mapping) if row is not None else None
+
+def _expire_stale_jobs(conn, kind):
+    table = SyncJob.__table__
+    cutoff = datetime.now() - JOB_STALE_AFTER
+    conn.execute(
+        update(table)
+        .where(table.c.kind == kind, table.c.status.in_(ACTIVE_JOB_STATUSES))
+        .where(func.coalesce(table.c.heartbeat_at, table.c.created_at) < cutoff)
+        .values(status=JOB_FAILED, error='Interrompido: sem atualização de progresso', finished_at=datetime.now())
+    )
+
+def _active_job_id(conn, kind):
+    table = SyncJob.__table__
+    return conn.execute(
+        select(table.c.id).where(table.c.kind == kind, table.c.status.in_(ACTIVE_JOB_STATUSES))
+    ).scalar()
+
+def create_job(kind, trigger='manual'):
+    """
+    Enfileira um job do tipo `kind`. Se já houver um em andamento, não cria outro.
+    Retorna (id do job, True se foi criado agora).
+    """
+    table = SyncJob.__table__
+    with engine.begin() as conn:
+        _expire_stale_jobs(conn, kind)
+        active_id = _active_job_id(conn, kind)
+        if active_id is not None:
+            return active_id, False
+    try:
+        with engine.begin() as conn:
+            result = conn.execute(insert(table).values(
+                kind=kind, status=JOB_QUEUED, trigger=trigger, progress=0, created_at=datetime.now()
+            ))
+            return result.inserted_primary_key[0], True
+    except IntegrityError:
+        # Outro processo/sessão criou o job entre a consulta e o insert (índice único parcial)
+        with engine.connect() as conn:
+            return _active_job_id(conn, kind), False
+
+def update_job(job_id, **values):
+    table = SyncJob.__table__
+    with engine.begin() as conn:
+        conn.execute(update(table).where(table.c.id == job_id).values({'heartbeat_at': datetime.now(), **values}))
+
+def get_job(job_id):
+    table = SyncJob.__table__
+    with engine.connect() as conn:
+        return _job_dict(conn.execute(select(table).where(table.c.id == job_id)).first())
+
+def get_latest_job(kind):
+    table = SyncJob.__table__
+    with engine.connect() as conn:
+        return _job_dict(conn.execute(
+            select(table).where(table.c.kind == kind).order_by(table.c.id.desc()).limit(1)
+        ).first())
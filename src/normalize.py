@@ -1,11 +1,112 @@
-def title_normalize(df):
-    forbidden_words = ['Pagamento recebido', 'Estorno']
-    df = df[~df['title'].isin(forbidden_words)]
-    df['title'] = (
-        df['title']
-        .replace(r'\s*- Parcela\s*\d+/\d+', '', regex=True)
-        .str.lower()
-        .str.strip()
+import copy
+import re
+import unicodedata
+
+import pandas as pd
+
+from src.instrumentation import timed
+
+forbidden_words = ['Pagamento recebido', 'Estorno']
+
+# Regras aplicadas, em ordem, sobre o título já em minúsculas: (nome, padrão, substituição)
+TITLE_RULES = [
+    ('installment', r'\s*-\s*parcela\s*\d+\s*/\s*\d+', ''),
+    ('refund', r'^estorno\s+(de\s+)?', ''),
+    ('card_suffix', r'\s*-?\s*(cart[aã]o\s+)?final\s+\d{4}\s*$', ''),
+    ('spaces', r'\s+', ' '),
+]
+
+# Número e total da parcela no título original ("Loja - Parcela 2/6"), antes da regra 'installment'
+INSTALLMENT_PATTERN = re.compile(r'-\s*parcela\s*(\d+)\s*/\s*(\d+)', re.IGNORECASE)
+
+
+def compile_rules(rules):
+    return [(re.compile(pattern, re.IGNORECASE), replacement) for _, pattern, replacement in rules]
+
+
+class TitleNormalizer:
+    """
+    Normaliza cada título distinto uma única vez (memo em dicionário).
+    `load` e `store` permitem buscar/gravar as formas canônicas num armazenamento
+    persistente, para que importação e palavras-chave compartilhem a mesma tabela.
+    """
+
+    def __init__(self, rules=TITLE_RULES, strip_accents=True, load=None, store=None):
+        self._rules = compile_rules(rules)
+        self._strip_accents = strip_accents
+        self._load = load
+        self._store = store
+        self._memo = {}
+
+    def apply_rules(self, title):
+        title = str(title).lower()
+        if self._strip_accents:
+            title = unicodedata.normalize('NFKD', title).encode('ascii', 'ignore').decode('ascii')
+        for pattern, replacement in self._rules:
+            title = pattern.sub(replacement, title)
+        return title.strip()
+
+    def remember(self, mapping):
+        self._memo.update(mapping)
+        if self._store and mapping:
+            self._store(mapping)
+
+    def normalize_many(self, titles):
+        missing = [title for title in titles if title not in self._memo]
+        if missing and self._load:
+            self._memo.update(self._load(missing))
+            missing = [title for title in missing if title not in self._memo]
+        if missing:
+            self.remember({title: self.apply_rules(title) for title in missing})
+        return [self._memo[title] for title in titles]
+
+    def normalize(self, title):
+        return self.normalize_many([title])[0]
+
+    def without_store(self):
+        """
+        Mesmo memo e mesma leitura, sem gravar: para quem persiste as formas novas por conta
+        própria (a importação grava na mesma transação dos lançamentos).
+        """
+        # Cópia rasa: o dicionário do memo é o mesmo objeto nos dois
+        normalizer = copy.copy(self)
+        normalizer._store = None
+        return normalizer
+
+
+# Normalizador em memória, usado quando não há um com persistência (ex: processos do importador)
+default_normalizer = TitleNormalizer()
+
+
+def canonical_titles(titles, normalizer=None):
+    # Cada título distinto é normalizado uma vez e o resultado é mapeado de volta às linhas
+    normalizer = normalizer or default_normalizer
+    codes, uniques = pd.factorize(titles.astype(str))
+    canonical = pd.Index(normalizer.normalize_many(list(uniques)), dtype=object)
+    return pd.Series(canonical.take(codes), index=titles.index)
+
+
+def installment_parts(titles):
+    """
+    Parcela de cada título original: DataFrame com installment_number e installment_total
+    (Int64, vazio para compras à vista). O regex roda uma vez por título distinto.
+    """
+    codes, uniques = pd.factorize(titles.astype(str))
+    parts = (
+        pd.Series(uniques, dtype=object).str.extract(INSTALLMENT_PATTERN)
+        .set_axis(['installment_number', 'installment_total'], axis=1)
+        .astype('Int64')
     )
+    return parts.take(codes).set_axis(titles.index)
+
+
+@timed('normalize')
+def title_normalize(df, normalizer=None):
+    df = df[~df['title'].isin(forbidden_words)].copy()
+    # Guarda o título original, usado para identificar linhas já importadas
+    df['raw_title'] = df['title']
+    df['title'] = canonical_titles(df['raw_title'], normalizer)
+    # A regra 'installment' tira a parcela do título; o número e o total ficam em colunas próprias
+    df[['installment_number', 'installment_total']] = installment_parts(df['raw_title'])
 
-    return df
\ No newline at end of file
+    return df
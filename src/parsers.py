@@ -0,0 +1,101 @@
+import io
+
+import pandas as pd
+
+
+class StatementFormat:
+    """
+    Descrição pré-compilada de um formato de extrato: colunas de origem -> date/title/amount,
+    dtypes, formato de data e sinal (extratos de conta trazem gastos como valores negativos).
+    """
+
+    def __init__(self, name, column_map, dtypes, date_format, sign=1):
+        self.name = name
+        self.column_map = column_map
+        self.dtypes = dtypes
+        self.date_format = date_format
+        self.sign = sign
+        self.signature = frozenset(column_map)
+
+    def __repr__(self):
+        return f"StatementFormat({self.name!r})"
+
+
+# Ordem de registro = ordem de tentativa na detecção
+FORMATS = {}
+
+
+def register_format(statement_format):
+    FORMATS[statement_format.name] = statement_format
+    return statement_format
+
+
+NUBANK_CARD = register_format(StatementFormat(
+    'nubank_card',
+    column_map={'date': 'date', 'title': 'title', 'amount': 'amount'},
+    dtypes={'title': str, 'amount': 'float64'},
+    date_format='%Y-%m-%d',
+))
+
+NUBANK_ACCOUNT = register_format(StatementFormat(
+    'nubank_account',
+    column_map={'Data': 'date', 'Descrição': 'title', 'Valor': 'amount'},
+    dtypes={'Descrição': str, 'Valor': 'float64'},
+    date_format='%d/%m/%Y',
+    sign=-1,
+))
+
+OFX_CSV = register_format(StatementFormat(
+    'ofx_csv',
+    column_map={'DTPOSTED': 'date', 'MEMO': 'title', 'TRNAMT': 'amount'},
+    dtypes={'MEMO': str, 'TRNAMT': 'float64'},
+    date_format='%Y%m%d',
+    sign=-1,
+))
+
+
+def _read_header(file):
+    if isinstance(file, (str, bytes)) or hasattr(file, '__fspath__'):
+        with open(file, encoding='utf-8-sig') as f:
+            return f.readline()
+    # Arquivo em memória (ex: UploadedFile do Streamlit): lê a primeira linha e volta ao início
+    position = file.tell()
+    line = file.readline()
+    file.seek(position)
+    if isinstance(line, bytes):
+        line = line.decode('utf-8-sig')
+    return line.lstrip('\ufeff')
+
+
+def sniff_format(file):
+    """Detecta o formato pelo cabeçalho. Retorna (formato, {coluna original: coluna de destino})."""
+    raw_columns = pd.read_csv(io.StringIO(_read_header(file)), nrows=0).columns
+    stripped = {column.strip(): column for column in raw_columns}
+    for statement_format in FORMATS.values():
+        if statement_format.signature <= stripped.keys():
+            return statement_format, {stripped[source]: target for source, target in statement_format.column_map.items()}
+    raise ValueError(f"Formato de extrato não reconhecido: {', '.join(stripped)}")
+
+
+def iter_statement(file, chunksize):
+    """
+    Lê um extrato em lotes já no formato date/title/amount (gastos positivos).
+    O cabeçalho é lido uma única vez para escolher o parser; o arquivo é lido uma única vez.
+    """
+    statement_format, columns = sniff_format(file)
+    raw_names = {target: source for source, target in columns.items()}
+    dtypes = {
+        raw_names[statement_format.column_map[source]]: dtype
+        for source, dtype in statement_format.dtypes.items()
+    }
+
+    reader = pd.read_csv(
+        file, chunksize=chunksize, usecols=list(columns), dtype=dtypes, encoding='utf-8-sig',
+    )
+    for chunk in reader:
+        chunk = chunk.rename(columns=columns)
+        if statement_format.sign != 1:
+            chunk['amount'] = chunk['amount'] * statement_format.sign
+        chunk = chunk[chunk['amount'] > 0].copy()
+        chunk['date'] = pd.to_datetime(chunk['date'], format=statement_format.date_format)
+        yield chunk[['date', 'title', 'amount']]
@@ -1,13 +1,18 @@
 import glob
+import hashlib
 import pandas as pd
 import streamlit as st
 from datetime import date, timedelta
+from src.parsers import iter_statement
+from src.instrumentation import timed
 
-data_file_path = glob.glob('./data/*.csv')
+# Linhas lidas por vez no carregamento em streaming
+LOAD_CHUNK_SIZE = 50_000
 
-def pre_load_csv_data():
+def pre_load_csv_data(path='./data'):
     df = []
-    for file in data_file_path:
+    # A pasta é listada só quando a função é chamada, não no import do módulo
+    for file in glob.glob(f'{path}/*.csv'):
         data = load_transactions(file)
         df.append(data)
 
@@ -15,17 +20,25 @@ def pre_load_csv_data():
 
     return df
 
+def iter_transactions(file, chunksize=LOAD_CHUNK_SIZE):
+    # Lê o arquivo em pedaços de tamanho fixo; o formato (Nubank cartão/conta, OFX) vem do cabeçalho
+    return iter_statement(file, chunksize)
+
+@timed('load')
 def load_transactions(file):
     try:
-        df = pd.read_csv(file)
-        df.columns = [col.strip() for col in df.columns]
-        df = df[df["amount"] > 0]
-        df["date"] = pd.to_datetime(df["date"])
-        return df
+        return pd.concat(iter_transactions(file), ignore_index=True)
     except Exception as e:
         st.error(f"Error processing file: {str(e)}")
         return None
 
+def file_sha256(path):
+    sha256 = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            sha256.update(block)
+    return sha256.hexdigest()
+
 def get_last_year_date():
     today = date.today()
-    return today - timedelta(days=365)
\ No newline at end of file
+    return today - timedelta(days=365)
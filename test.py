@@ -1,6 +1,7 @@
+import os
 from sqlalchemy import inspect, create_engine
 
-engine = create_engine('sqlite:///finances.db')
+engine = create_engine(os.environ.get('DATABASE_URL', 'sqlite:///finances.db'))
 inspector = inspect(engine)
 print(inspector.get_table_names())  # mostra todas as tabelas
 